@@ -2,6 +2,9 @@
 import numpy as np
 from enum import Enum
 
+from decision_table import DecisionTable, NOT_VACCINATE, VACCINATE
+from metrics import NullProfiler
+
 
 
 class Health(Enum):
@@ -16,6 +19,17 @@ class Group(Enum):
     TRUSTER = 1
 
 
+class GroupBehavior:
+
+    """
+    Believes of a Group: Ci is the cost of an infection and Cv the cost of a vaccination
+    """
+    def __init__(self, type, Cv, Ci=1):
+        self.type = type
+        self.Ci = Ci
+        self.Cv = Cv
+
+
 class Agent(object):
     """
     Agent class able to play the vaccination game
@@ -30,14 +44,11 @@ class Agent(object):
     T = 5  # (monthly)  # 0.0 <= beta <= 1.0
     beta = 0.1
 
-    num_vac = 0
-    num_vacT = 0
-    num_vacS = 0
-    num_sus = 0
-    num_inf = 0
-    num_infT = 0
-    num_infS = 0
-    num_rec = 0
+    # generator of all random decisions of the agents, replace it with a seeded one to reproduce a simulation
+    rng = np.random.default_rng()
+
+    # precomputed infection probabilities and vaccination decisions, see decision_table.py
+    table = DecisionTable()
 
     def __init__(self, id, age, health, group):
 
@@ -87,17 +98,24 @@ class Agent(object):
         self._group = group
         self._lambda_k = 0.0
         self._lambda_rel_k = 0.0
+        self._num_infected = 0
+        self._num_neighbors = 0
         self._gamma_k = self.estimate_gamma()
 
         self._health_next = None
 
         super().__init__()
 
-    def run(self, group_behaviours, neighbors, depth_neighbors, agents):
+    def run(self, group_behaviours, neighbors, depth_neighbors, agents, profiler=NullProfiler()):
+        """
+        :param profiler: PhaseProfiler that adds the time of every phase (recover, look, look depth, act) of this agent
+        """
+        t = profiler.tick()
         if self._health == Health.INFECTED:
-            if np.random.uniform(0.0, 1.0) < self._gamma_k:
+            if Agent.rng.random() < self._gamma_k:
                 self._health = Health.RECOVERED
-                return
+            profiler.record("recover", t)
+            return
 
         if not self._health == Health.SUSCEPTIBLE:
             return
@@ -105,15 +123,18 @@ class Agent(object):
         # Get infected?
         self.look(neighbors, agents)
 
-        p = np.random.uniform(0, 1.0)
+        p = Agent.rng.random()
         if p < self._lambda_k:
             self._health_next = Health.INFECTED
+        t = profiler.record("look", t)
 
         # Get vaccinated? (Decide once in 30 days)
         self.look(depth_neighbors, agents)
-        dec = np.random.uniform(0.0, 1.0)
+        dec = Agent.rng.random()
+        t = profiler.record("look depth", t)
         if dec < 1/self.T and not self._health_next == Health.INFECTED:
             self.act(group_behaviours)
+            profiler.record("act", t)
 
     def look(self, neighbors, agents):
         """
@@ -136,6 +157,8 @@ class Agent(object):
         # Update probability of infection
         self._lambda_k = self.estimate_lambda(count_infected)
         self._lambda_rel_k = Agent.beta * count_infected / total
+        self._num_infected = count_infected
+        self._num_neighbors = total
 
     def act(self, group_behaviours):
         # If agent is already vaccinated or recovered, no action takes place
@@ -143,39 +166,29 @@ class Agent(object):
         # Look around and update infection probability (lambda)
         # self.look(neighbors)
 
-        # Compute Cnotv_k
-
-        r = self.r
-        T = self.T
-
-        lambda_k = self._lambda_k  # review of lambda required -> 1 - beta^(infected neighbors)
-        gamma_k = self._gamma_k
-        lambda_rel_k = self._lambda_rel_k
-
+        # Look up the decision for Cnotv_k, which depends only on the group, the number of infected agents in the
+        # neighborhood and its size (and the static attributes)
+        Ci = []
+        Cv = []
+        group = 0
         for i in range(0, len(group_behaviours)):
+            Ci.append(group_behaviours[i].Ci)
+            Cv.append(group_behaviours[i].Cv)
             if self._group == group_behaviours[i].type:
-                Ci_k = group_behaviours[i].Ci
-                Cv_k = group_behaviours[i].Cv
-
-        sum = [0.0, 0.0]
-        for t in range(1, T + 1):
-            sum[0] += ((1 - lambda_rel_k) / (1 + r)) ** t
-            sum[1] += ((1 - gamma_k) / (1 + r)) ** t
-
-        Cnotv_k = Ci_k * (lambda_rel_k / (gamma_k - lambda_rel_k)) * (sum[0] - sum[1])
+                group = i
+        Agent.table.update_decisions(Agent.beta, self.T, self.r, self._gamma_k, Ci, Cv, self._num_neighbors)
+        decision = Agent.table.decision(group, self._num_infected, self._num_neighbors)
 
         # Get pvacc
-        if Cv_k > Cnotv_k:
+        if decision == NOT_VACCINATE:
             pvacc = 0.0
-        elif Cv_k < Cnotv_k:
+        elif decision == VACCINATE:
             pvacc = 1.0
         else:
-            pvacc = np.random.uniform(0.0, 1.0)
-        #if lambda_rel_k > 0:
-            #print(self._group, pvacc, Cv_k, Cnotv_k, "s0 / 1", sum[0], sum[1], "g, l", gamma_k, lambda_rel_k)
+            pvacc = Agent.rng.random()
 
         # Update health state based on pvacc
-        p = np.random.uniform(0.0, 1.0)
+        p = Agent.rng.random()
         if pvacc >= p:
             self._health = Health.VACCINATED
 
@@ -195,7 +208,8 @@ class Agent(object):
         of infected individuals surrounding the agent and the conditional
         probability of getting infected given a local prevalence
         '''
-        return 1 - pow((1-Agent.beta), num_infected)
+        Agent.table.update_infection(Agent.beta, num_infected)
+        return Agent.table.infection_probability[num_infected]
 
     def estimate_gamma(self):
         '''
@@ -0,0 +1,201 @@
+"""
+Benchmarks the stages of a simulation at different network sizes and depths and writes the results to a JSON file, so the
+performance of two commits can be compared.
+
+Stages (every one is measured in a fresh process for every size and depth, so the peak RSS belongs to that case only):
+- SmallWorldNetwork.__init__   building the network, including the depth neighbors
+- compute_depth_neighbors      building the depth neighbors again
+- setup                        creating the population and the engine
+- simulate                     frames days of the engine
+- counters                     reading the numbers of all health states, once for every day
+- time_stamp                   drawing a frame of the animation, once for every day (only up to --render-max nodes)
+
+usage:
+    python benchmark.py                                   all sizes and depths, writes benchmarks/<commit>.json
+    python benchmark.py --sizes 1000 10000 --depths 1     only some cases
+    python benchmark.py --sizes 1000000 --depths 1        the large case, needs several GB of memory
+    python benchmark.py --compare old.json new.json       prints the ratios new / old, exit code 1 on a regression
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+def peak_rss_mb():
+    """
+    :return: peak resident set size of this process so far (MB)
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on linux
+    if sys.platform == "darwin":
+        return peak / 2**20
+    return peak / 2**10
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Case:
+
+    """
+    Measures the stages of one network size and depth and collects them in records
+    """
+    def __init__(self, n, depth, engine):
+        self.n = n
+        self.depth = depth
+        self.engine = engine
+        self.records = []
+
+    def measure(self, stage, function, calls=1, agent_days=None):
+        """
+        Calls function calls times and records the wall time and the peak RSS after it
+        :param agent_days: number of simulated agent-days of all calls, for the throughput
+        :return: return value of the last call
+        """
+        start = time.perf_counter()
+        for i in range(calls):
+            value = function()
+        wall = time.perf_counter() - start
+
+        self.records.append({
+            "stage": stage,
+            "n": self.n,
+            "depth": self.depth,
+            "engine": self.engine,
+            "calls": calls,
+            "wall_s": wall,
+            "peak_rss_mb": peak_rss_mb(),
+            "agent_days_per_s": agent_days / wall if agent_days is not None and wall > 0 else None,
+        })
+        print("n=%d depth=%d %-27s %9.3f s" % (self.n, self.depth, stage, wall), flush=True)
+        return value
+
+
+def run_case(n, depth, frames, engine, render, seed):
+    """
+    Runs all stages for one network size and depth, called in its own process
+    :return: list of records
+    """
+    from simulation import SimulationConfig, EngineMode, build_world, setup
+
+    config = SimulationConfig(n=n, depth=depth, frames=frames, engine=EngineMode[engine], seed=seed)
+    case = Case(n, depth, engine)
+
+    world = case.measure("SmallWorldNetwork.__init__", lambda: build_world(config))
+    case.measure("compute_depth_neighbors", lambda: world.compute_depth_neighbors(depth))
+    world, engine = case.measure("setup", lambda: setup(config, world))
+    case.measure("simulate", engine.step, calls=frames, agent_days=world.num_nodes * frames)
+    case.measure("counters", lambda: engine.counters.counts.copy(), calls=frames)
+
+    if render:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        from layout import LayoutService
+        from renderer import NetworkRenderer
+
+        fig = plt.figure(dpi=100)
+        renderer = NetworkRenderer(fig, world, LayoutService.group_rings_layout(world))
+
+        def time_stamp():
+            renderer.update(engine.health)
+            fig.canvas.draw()
+
+        case.measure("time_stamp", time_stamp, calls=frames, agent_days=world.num_nodes * frames)
+        plt.close(fig)
+
+    return case.records
+
+
+def run_benchmarks(sizes, depths, frames=10, engine="VECTORIZED", render_max=10000, seed=1):
+    """
+    Runs every size and depth in a fresh process
+    :return: dict with the commit, the settings and all records
+    """
+    records = []
+    for n in sizes:
+        for depth in depths:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                records += executor.submit(run_case, n, depth, frames, engine, n <= render_max, seed).result()
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "frames": frames,
+        "seed": seed,
+        "records": records,
+    }
+
+
+def compare(old_path, new_path, tolerance=0.1):
+    """
+    Prints new wall time / old wall time of every stage that is in both files
+    :param tolerance: a ratio above 1 + tolerance is a regression
+    :return: True if there is no regression
+    """
+    with open(old_path) as file:
+        old = json.load(file)
+    with open(new_path) as file:
+        new = json.load(file)
+
+    def key(record):
+        return record["stage"], record["n"], record["depth"], record["engine"]
+
+    old_records = {key(record): record for record in old["records"]}
+    ok = True
+    print("%s -> %s" % (old.get("commit"), new.get("commit")))
+    for record in new["records"]:
+        if key(record) not in old_records:
+            continue
+        old_record = old_records[key(record)]
+        ratio = record["wall_s"] / old_record["wall_s"] if old_record["wall_s"] > 0 else float("inf")
+        regression = ratio > 1 + tolerance
+        ok = ok and not regression
+        print("n=%-8d depth=%d %-27s %9.3f s -> %9.3f s  x%.2f  rss %7.1f -> %7.1f MB%s"
+              % (record["n"], record["depth"], record["stage"], old_record["wall_s"], record["wall_s"], ratio,
+                 old_record["peak_rss_mb"], record["peak_rss_mb"], "  REGRESSION" if regression else ""))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmarks the stages of a simulation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--frames", type=int, default=10, help="simulated days per case")
+    parser.add_argument("--engine", default="VECTORIZED", help="name of an EngineMode")
+    parser.add_argument("--render-max", type=int, default=10000, help="largest n for which time_stamp is measured")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="JSON file, benchmarks/<commit>.json by default")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two JSON files instead")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed slowdown in --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(0 if compare(args.compare[0], args.compare[1], args.tolerance) else 1)
+
+    benchmark = run_benchmarks(args.sizes, args.depths, args.frames, args.engine, args.render_max, args.seed)
+    output = args.output
+    if output is None:
+        output = os.path.join("benchmarks", (benchmark["commit"] or "benchmark") + ".json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(benchmark, file, indent=2)
+    print("written to " + output)
+
+
+if __name__ == "__main__":
+    main()
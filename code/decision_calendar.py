@@ -0,0 +1,41 @@
+import numpy as np
+
+
+class DecisionCalendar:
+
+    """
+    Bucketed calendar queue of the days on which susceptible agents decide whether to vaccinate. Deciding on every day
+    with probability 1 / T is the same as waiting a geometric number of days (mean T) from one decision to the next, so
+    the next decision day of every agent is drawn once and the agent is put into the bucket of that day. A day only
+    touches the agents in its bucket instead of drawing a uniform for every susceptible agent.
+    """
+    def __init__(self, rng):
+        """
+        :param rng: numpy.random.Generator for the waiting times
+        """
+        self.rng = rng
+        # buckets[day] = list of arrays of the agents deciding on day
+        self.buckets = {}
+
+    def schedule(self, nodes, day, probability):
+        """
+        Puts every agent of nodes into the bucket of its next decision day: day with the given probability, else the
+        day after with the given probability, ...
+        """
+        if len(nodes) == 0:
+            return
+        days = day + self.rng.geometric(probability, len(nodes)) - 1
+        order = np.argsort(days, kind='stable')
+        days = days[order]
+        starts = np.flatnonzero(np.concatenate(([True], days[1:] != days[:-1])))
+        for start, stop in zip(starts, np.append(starts[1:], len(days))):
+            self.buckets.setdefault(int(days[start]), []).append(nodes[order[start:stop]])
+
+    def due(self, day):
+        """
+        :return: the agents deciding on day, removed from the calendar
+        """
+        bucket = self.buckets.pop(day, [])
+        if len(bucket) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(bucket)
@@ -0,0 +1,89 @@
+import numpy as np
+
+# vaccination decisions stored in DecisionTable.decisions
+NOT_VACCINATE = 0
+VACCINATE = 1
+# both costs are equal, decide at random
+RANDOM = 2
+
+
+def cost_not_vaccinating(lambda_rel_k, gamma_k, Ci_k, r, T):
+    """
+    Expected cost of not vaccinating over the time window T, see Agent.act(). Works on scalars and numpy arrays.
+    """
+    sum0 = 0.0
+    sum1 = 0.0
+    for t in range(1, T + 1):
+        sum0 += ((1 - lambda_rel_k) / (1 + r)) ** t
+        sum1 += ((1 - gamma_k) / (1 + r)) ** t
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return Ci_k * (lambda_rel_k / (gamma_k - lambda_rel_k)) * (sum0 - sum1)
+
+
+class DecisionTable:
+
+    """
+    Precomputed infection probabilities and vaccination decisions, so that estimating lambda and deciding whether to
+    vaccinate are table lookups.
+
+    * infection_probability[c] = 1 - (1 - beta)^c is the probability of getting infected with c infected neighbors
+    * decisions[g, offsets[s] + c] is the decision (NOT_VACCINATE, VACCINATE or RANDOM) of an agent of group g with c
+      infected agents in its neighborhood of size s, 0 <= c <= s
+
+    Both only depend on (infected count, neighborhood size, group, gamma, r, T) and are rebuilt by update_infection() and
+    update_decisions() only if one of their parameters changed or a larger neighborhood has to be looked up.
+    """
+    def __init__(self):
+        self.infection_key = None
+        self.infection_probability = np.zeros(0)
+
+        self.decision_key = None
+        self.max_size = -1
+        self.offsets = np.zeros(0, dtype=np.int64)
+        self.decisions = np.zeros((0, 0), dtype=np.int8)
+
+    def update_infection(self, beta, max_count):
+        """
+        makes sure infection_probability covers 0, ..., max_count infected neighbors for the infection rate beta
+        """
+        if self.infection_key == beta and max_count < len(self.infection_probability):
+            return
+        self.infection_key = beta
+        # only grow (doubling) if more counts are needed, not if just beta changed
+        size = len(self.infection_probability)
+        counts = np.arange(0, max(max_count + 1, 2 * size if max_count >= size else size))
+        self.infection_probability = 1 - np.power(1 - beta, counts)
+
+    def update_decisions(self, beta, T, r, gamma, Ci, Cv, max_size):
+        """
+        makes sure decisions covers all neighborhoods up to size max_size for the groups with the costs Ci[g], Cv[g]
+        """
+        key = (beta, T, r, gamma, tuple(Ci), tuple(Cv))
+        if self.decision_key == key and max_size <= self.max_size:
+            return
+        self.decision_key = key
+        # only grow (doubling) if a larger neighborhood is needed, not if just the parameters changed
+        if max_size > self.max_size:
+            self.max_size = max(max_size, 2 * self.max_size)
+
+        # all pairs (size, count) with 0 <= count <= size, stored size after size
+        sizes = np.arange(0, self.max_size + 1)
+        self.offsets = sizes * (sizes + 1) // 2
+        size = np.repeat(sizes, sizes + 1)
+        count = np.arange(0, len(size)) - self.offsets[size]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lambda_rel_k = beta * count / size
+
+        self.decisions = np.zeros((len(Ci), len(size)), dtype=np.int8)
+        for g in range(0, len(Ci)):
+            Cnotv_k = cost_not_vaccinating(lambda_rel_k, gamma, Ci[g], r, T)
+            self.decisions[g] = RANDOM
+            self.decisions[g][Cv[g] > Cnotv_k] = NOT_VACCINATE
+            self.decisions[g][Cv[g] < Cnotv_k] = VACCINATE
+
+    def decision(self, group, count, size):
+        """
+        :return: the decision of agents of group with count infected agents in their neighborhood of the given size
+        """
+        return self.decisions[group, self.offsets[size] + count]
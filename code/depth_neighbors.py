@@ -0,0 +1,80 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from infection_pressure import adjacency_matrix
+
+
+class DepthNeighborsBuilder:
+
+    """
+    Builds the depth-k neighborhoods of all nodes in bulk from the CSR form of a network, instead of running a shortest
+    path search from every node. The nodes are processed in chunks of chunk_size nodes: the rows of the chunk are expanded
+    frontier by frontier with sparse matrix products (frontier * adjacency, minus the nodes reached so far) and the result
+    is written straight into the growing int32 indptr / indices arrays. So the temporary memory is bounded by the chunk
+    size and does not grow with the number of nodes.
+    peak_bytes holds the largest amount of memory (output plus temporaries) used by the last call of build().
+    """
+    def __init__(self, indptr, indices, chunk_size=4096):
+        self.adjacency = adjacency_matrix(indptr, indices)
+        self.num_nodes = len(indptr) - 1
+        self.chunk_size = chunk_size
+        self.peak_bytes = 0
+
+    def build(self, depth):
+        """
+        :return: int32 arrays depth_indptr, depth_indices st. depth_indices[depth_indptr[i]:depth_indptr[i + 1]] are the
+        sorted nodes j, i =/= j, with shortest path(i, j) <= depth
+        """
+        self.peak_bytes = 0
+        depth_indptr = np.zeros(self.num_nodes + 1, dtype=np.int32)
+        depth_indices = np.zeros(self.adjacency.nnz, dtype=np.int32)
+        size = 0
+
+        for start in range(0, self.num_nodes, self.chunk_size):
+            stop = min(start + self.chunk_size, self.num_nodes)
+            reached = self.expand(start, stop, depth)
+            temporary_bytes = reached.data.nbytes + reached.indices.nbytes + reached.indptr.nbytes
+
+            # grow the output by doubling its size, like a list does
+            if size + reached.nnz > len(depth_indices):
+                grown = np.zeros(max(2 * len(depth_indices), size + reached.nnz), dtype=np.int32)
+                grown[:size] = depth_indices[:size]
+                temporary_bytes += depth_indices.nbytes
+                depth_indices = grown
+
+            depth_indices[size:size + reached.nnz] = reached.indices
+            depth_indptr[start + 1:stop + 1] = size + reached.indptr[1:]
+            size += reached.nnz
+
+            self.peak_bytes = max(self.peak_bytes, depth_indptr.nbytes + depth_indices.nbytes + temporary_bytes)
+
+        # trimming the output copies it once more
+        self.peak_bytes = max(self.peak_bytes, depth_indptr.nbytes + depth_indices.nbytes + 4 * size)
+        return depth_indptr, depth_indices[:size].copy()
+
+    def expand(self, start, stop, depth):
+        """
+        :return: sparse matrix whose row i - start contains the depth-k neighborhood of node i, start <= i < stop
+        """
+        frontier = self.adjacency[start:stop]
+
+        # the node itself is not part of its neighborhood, mark it as reached to not walk back to it
+        own = csr_matrix((np.ones(stop - start, dtype=np.int32), np.arange(start, stop, dtype=np.int32),
+                          np.arange(0, stop - start + 1, dtype=np.int32)), shape=frontier.shape)
+        reached = frontier + own
+        reached.data[:] = 1
+
+        for d in range(1, depth):
+            candidates = frontier @ self.adjacency
+            candidates.data[:] = 1
+            frontier = candidates - candidates.multiply(reached)
+            frontier.eliminate_zeros()
+            if frontier.nnz == 0:
+                break
+            reached = reached + frontier
+            reached.data[:] = 1
+
+        reached = reached - own
+        reached.eliminate_zeros()
+        reached.sort_indices()
+        return reached
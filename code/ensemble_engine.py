@@ -0,0 +1,138 @@
+import numpy as np
+
+from agent import Agent, Health
+from decision_table import DecisionTable, NOT_VACCINATE, VACCINATE
+from infection_pressure import adjacency_matrix
+from metrics import NullProfiler
+
+
+class EnsembleEngine:
+
+    """
+    Simulates R replicates of the SIVR model on the same network at once. health[r, i] is the health value of agent i in
+    replicate r, so every step of VectorizedEngine is done for all replicates together: the infected neighbors of all
+    agents of all replicates are counted with one sparse matrix times (n x R) matrix product, and all vaccination
+    decisions of a day are one lookup in the DecisionTable. The per step overhead of python and numpy is shared by all
+    replicates, which makes averaging over many small simulations (VACCIPLOT) much faster.
+
+    Same semantics as VectorizedEngine (every agent looks at the health states from the start of the day). gamma does not
+    depend on the age (see Agent.estimate_gamma()), so no ages are kept.
+    """
+    def __init__(self, world, health, group, groups, group_behaviours, rng=None, profiler=None, beta=None, T=None,
+                 r=None):
+        """
+        :param world: SmallWorldNetwork of all replicates
+        :param health: (R x n) array, health value of every agent in every replicate
+        :param group: group id of every agent, index into groups, the same in all replicates
+        :param groups: groups[i] is the Group of the agents with group id i
+        :param group_behaviours: the believes of every Group
+        :param rng: seed or numpy.random.Generator, all uniforms of a day are drawn from it in one block
+        :param profiler: PhaseProfiler that measures the phases of step(), nothing is measured if None
+        :param beta: infection rate, Agent.beta if None
+        :param T: how far agents look into the future when deciding to vaccinate (days), Agent.T if None
+        :param r: discount rate, Agent.r if None
+        """
+        self.world = world
+        self.beta = beta if beta is not None else Agent.beta
+        self.T = T if T is not None else Agent.T
+        self.r = r if r is not None else Agent.r
+        self.rng = np.random.default_rng(rng)
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        self.health = np.array(health, dtype=np.int8)
+        self.num_replicates, self.num_agents = self.health.shape
+        self.group = np.asarray(group, dtype=np.int8)
+        self.groups = groups
+
+        # see Agent.estimate_gamma()
+        self.gamma = 0.05 + 0.00000019121986216
+
+        # Ci and Cv of every group id
+        self.Ci = np.zeros(len(groups))
+        self.Cv = np.zeros(len(groups))
+        for i in range(0, len(groups)):
+            for behaviour in group_behaviours:
+                if behaviour.type == groups[i]:
+                    self.Ci[i] = behaviour.Ci
+                    self.Cv[i] = behaviour.Cv
+
+        self.adjacency = adjacency_matrix(world.indptr, world.indices)
+        self.depth_adjacency = adjacency_matrix(world.depth_indptr, world.depth_indices)
+        self.num_depth_neighbors = np.diff(world.depth_indptr)
+
+        # counts[r, health value, group id]
+        self.counts = np.zeros((self.num_replicates, len(Health), len(groups)), dtype=np.int64)
+        replicate = np.repeat(np.arange(self.num_replicates), self.num_agents)
+        np.add.at(self.counts, (replicate, self.health.ravel(), np.tile(self.group, self.num_replicates)), 1)
+
+        self.table = DecisionTable()
+        self.max_size = int(max(np.diff(world.indptr).max(initial=0), self.num_depth_neighbors.max(initial=0)))
+
+    def step(self):
+        """
+        Simulates one day of all replicates
+        """
+        profiler = self.profiler
+        t = profiler.tick()
+        infected = self.health == Health.INFECTED.value
+        susceptible = self.health == Health.SUSCEPTIBLE.value
+
+        p_recover, p_infect, p_decide, p_pvacc, p_vaccinate = self.rng.random((5,) + self.health.shape)
+        t = profiler.record("random", t)
+
+        # (n x n) @ (n x R), transposed back to (R x n)
+        indicator = np.ascontiguousarray(infected.T, dtype=np.int32)
+        count_infected = (self.adjacency @ indicator).T
+        count_depth_infected = (self.depth_adjacency @ indicator).T
+        self.table.update_infection(self.beta, self.max_size)
+        t = profiler.record("count", t)
+
+        # Get infected?
+        infected_next = susceptible & (p_infect < self.table.infection_probability[count_infected])
+        t = profiler.record("look", t)
+
+        # Get vaccinated? (Decide once in T days)
+        replicates, agents = np.nonzero(susceptible & (p_decide < 1 / self.T) & ~infected_next)
+        t = profiler.record("look depth", t)
+        self.table.update_decisions(self.beta, self.T, self.r, self.gamma, self.Ci, self.Cv, self.max_size)
+        decision = self.table.decision(self.group[agents], count_depth_infected[replicates, agents],
+                                       self.num_depth_neighbors[agents])
+        pvacc = p_pvacc[replicates, agents]
+        pvacc[decision == NOT_VACCINATE] = 0.0
+        pvacc[decision == VACCINATE] = 1.0
+        vaccinated = pvacc >= p_vaccinate[replicates, agents]
+        replicates, agents = replicates[vaccinated], agents[vaccinated]
+        self.health[replicates, agents] = Health.VACCINATED.value
+        self.change(replicates, agents, Health.SUSCEPTIBLE, Health.VACCINATED)
+        t = profiler.record("act", t)
+
+        # Recover?
+        replicates, agents = np.nonzero(infected & (p_recover < self.gamma))
+        self.health[replicates, agents] = Health.RECOVERED.value
+        self.change(replicates, agents, Health.INFECTED, Health.RECOVERED)
+        t = profiler.record("recover", t)
+
+        replicates, agents = np.nonzero(infected_next)
+        self.health[replicates, agents] = Health.INFECTED.value
+        self.change(replicates, agents, Health.SUSCEPTIBLE, Health.INFECTED)
+        profiler.record("update", t)
+
+    def absorbing(self):
+        """
+        :return: True if no agent of any replicate can change its health any more, see VectorizedEngine.absorbing()
+        """
+        if self.counts[:, Health.INFECTED.value].sum() > 0:
+            return False
+        susceptible = np.any(self.health == Health.SUSCEPTIBLE.value, axis=0)
+        return bool(np.all(self.Cv[self.group[susceptible]] > 0) and np.all(self.num_depth_neighbors[susceptible] > 0))
+
+    def change(self, replicates, agents, old_health, new_health):
+        """
+        Updates counts for the agents that changed from old_health to new_health in the given replicates
+        """
+        if len(agents) == 0:
+            return
+        num_groups = self.counts.shape[2]
+        changed = np.bincount(replicates * num_groups + self.group[agents], minlength=self.num_replicates * num_groups)
+        changed = changed.reshape(self.num_replicates, num_groups)
+        self.counts[:, old_health.value] -= changed
+        self.counts[:, new_health.value] += changed
@@ -0,0 +1,131 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+def adjacency_matrix(indptr, indices):
+    """
+    :return: sparse (n x n) matrix with A[i, j] = 1 <=> j is in indices[indptr[i]:indptr[i + 1]]
+    """
+    n = len(indptr) - 1
+    data = np.ones(len(indices), dtype=np.int32)
+    return csr_matrix((data, indices, indptr), shape=(n, n))
+
+
+def gather_neighbors(indptr, indices, nodes):
+    """
+    :return: the concatenated neighbors indices[indptr[i]:indptr[i + 1]] of all i in nodes
+    """
+    starts = indptr[nodes].astype(np.int64)
+    lengths = indptr[nodes + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return indices[offsets]
+
+
+def segment_sums(values, lengths):
+    """
+    :return: the sums of the consecutive segments of values with the given lengths
+    """
+    ends = np.cumsum(lengths)
+    sums = np.concatenate(([0], np.cumsum(values, dtype=np.int64)))
+    return sums[ends] - sums[ends - lengths]
+
+
+class InfectionPressure:
+
+    """
+    Counts the infected direct neighbors of the susceptible nodes of a SmallWorldNetwork on its CSR arrays, choosing the
+    direction every day like a direction-optimizing BFS:
+    * push: walk the adjacency of every infected node and add 1 to each neighbor, costs the degrees of the infected nodes
+    * pull: sum the infected indicator over the adjacency of every susceptible node, costs their degrees
+    Early in an epidemic (few infected) push is cheap, near the peak and later (few susceptible) pull is.
+    The infected depth-k neighbors are only counted for the nodes that need them (the agents deciding whether to
+    vaccinate), by pulling over their depth-k neighborhoods.
+    """
+
+    # cost of a pushed edge relative to a pulled edge (both measured about 16 ns per edge with numpy 2.4, n = 100000)
+    push_cost = 1
+
+    def __init__(self, world, infected):
+        """
+        :param infected: indices of the infected nodes (or boolean array, infected[i] <=> node i is infected)
+        """
+        self.world = world
+
+        # size of the neighborhoods, used as the total of Agent.look()
+        self.num_neighbors = np.diff(world.indptr)
+        self.num_depth_neighbors = np.diff(world.depth_indptr)
+
+        # indicator[i] = 1 <=> node i is infected, kept up to date by change()
+        self.indicator = np.zeros(len(self.num_neighbors), dtype=np.int32)
+        self.indicator[infected] = 1
+        # only non zero during a push
+        self.pushed = np.zeros(len(self.num_neighbors), dtype=np.int64)
+        # number of days counted by pushing and by pulling
+        self.pushes = 0
+        self.pulls = 0
+
+    def count(self, infected, susceptible):
+        """
+        :param infected: indices of the infected nodes
+        :param susceptible: indices of the susceptible nodes
+        :return: number of infected direct neighbors of every node in susceptible
+        """
+        push_edges = self.num_neighbors[infected].sum()
+        pull_edges = self.num_neighbors[susceptible].sum()
+        if push_edges * self.push_cost < pull_edges:
+            self.pushes += 1
+            return self.push(infected, susceptible)
+        self.pulls += 1
+        return self.pull(susceptible)
+
+    def push(self, infected, nodes):
+        neighbors = gather_neighbors(self.world.indptr, self.world.indices, infected)
+        np.add.at(self.pushed, neighbors, 1)
+        counts = self.pushed[nodes]
+        self.pushed[neighbors] = 0
+        return counts
+
+    def pull(self, nodes):
+        neighbors = gather_neighbors(self.world.indptr, self.world.indices, nodes)
+        return segment_sums(self.indicator[neighbors], self.num_neighbors[nodes])
+
+    def count_depth(self, nodes):
+        """
+        :return: number of infected depth-k neighbors of every node in nodes
+        """
+        neighbors = gather_neighbors(self.world.depth_indptr, self.world.depth_indices, nodes)
+        return segment_sums(self.indicator[neighbors], self.num_depth_neighbors[nodes])
+
+    def change(self, nodes, delta):
+        """
+        :param nodes: indices of the nodes that got infected (delta = 1) or stopped being infected (delta = -1)
+        """
+        self.indicator[nodes] += delta
+
+
+class IncrementalInfectionPressure(InfectionPressure):
+
+    """
+    Keeps the number of infected direct neighbors of every node and only updates them when a node enters or leaves
+    Health.INFECTED, by pushing +1 / -1 along its adjacency. The cost of a day scales with the number of transitions
+    instead of the number of edges. The depth-k counts are pulled like in InfectionPressure, as only a few agents need
+    them every day.
+    """
+    def __init__(self, world, infected):
+        super().__init__(world, infected)
+        self.infected_neighbors = adjacency_matrix(world.indptr, world.indices) @ self.indicator
+
+    def count(self, infected, susceptible):
+        """
+        :return: the maintained number of infected direct neighbors of every node in susceptible
+        """
+        return self.infected_neighbors[susceptible]
+
+    def change(self, nodes, delta):
+        """
+        :param nodes: indices of the nodes that got infected (delta = 1) or stopped being infected (delta = -1)
+        """
+        if len(nodes) == 0:
+            return
+        self.indicator[nodes] += delta
+        np.add.at(self.infected_neighbors, gather_neighbors(self.world.indptr, self.world.indices, nodes), delta)
@@ -0,0 +1,81 @@
+import hashlib
+import os
+from enum import Enum
+
+import numpy as np
+
+
+class Layout(Enum):
+    # force-directed networkx.spring_layout, O(n^2) per iteration
+    SPRING = 0
+    # every group on its own ring, the rings placed on a circle, O(n)
+    GROUP_RINGS = 1
+
+
+class LayoutService:
+
+    """
+    Computes the positions of the nodes of a SmallWorldNetwork for the animation and caches them on disk, keyed by a hash
+    of the topology (CSR arrays and groups), the layout and the seed. So the same network is only laid out once.
+    """
+    def __init__(self, cache_dir=os.path.join("cache", "layouts")):
+        self.cache_dir = cache_dir
+
+    def layout(self, world, layout=Layout.SPRING, seed=None):
+        """
+        :return: array of shape (n, 2), the position of node i is layout(...)[i]
+        """
+        path = os.path.join(self.cache_dir, self.key(world, layout, seed) + ".npy")
+        if os.path.exists(path):
+            return np.load(path)
+
+        if layout == Layout.SPRING:
+            positions = self.spring_layout(world, seed)
+        else:
+            positions = self.group_rings_layout(world)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        np.save(path, positions)
+        return positions
+
+    @staticmethod
+    def key(world, layout, seed):
+        """
+        :return: hash of the topology of world, the layout and the seed
+        """
+        digest = hashlib.sha1()
+        digest.update(np.ascontiguousarray(world.indptr).tobytes())
+        digest.update(np.ascontiguousarray(world.indices).tobytes())
+        digest.update(np.asarray(world.group_colors, dtype=np.int32).tobytes())
+        digest.update((layout.name + str(seed)).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def spring_layout(world, seed):
+        import networkx as nx
+
+        pos = nx.spring_layout(world.network, seed=seed)
+        return np.array([pos[i] for i in range(world.num_nodes)])
+
+    @staticmethod
+    def group_rings_layout(world):
+        """
+        Uses the structure of the SmallWorldNetwork: the nodes of group i are groups_translation[i], ...,
+        groups_translation[i + 1] - 1 and form a watts_strogatz_graph ring in this order, so every group is placed on
+        its own ring (neighbors in the ring are close) and the rings are placed on a circle around the origin.
+        """
+        positions = np.zeros((world.num_nodes, 2))
+        num_groups = len(world.groups_translation) - 1
+        sizes = np.diff(world.groups_translation)
+        radii = np.sqrt(sizes / max(sizes.max(initial=1), 1))
+        distance = 0.0 if num_groups == 1 else 2.2 * radii.max(initial=0) / (2 * np.sin(np.pi / num_groups))
+
+        for i in range(num_groups):
+            start = world.groups_translation[i]
+            stop = world.groups_translation[i + 1]
+            angles = 2 * np.pi * np.arange(stop - start) / max(stop - start, 1)
+            center = 2 * np.pi * i / num_groups
+            positions[start:stop, 0] = distance * np.cos(center) + radii[i] * np.cos(angles)
+            positions[start:stop, 1] = distance * np.sin(center) + radii[i] * np.sin(angles)
+
+        return positions
@@ -1,26 +1,26 @@
-import networkx as nx
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from matplotlib.lines import Line2D
+import time
 
+# measured before all other imports, see main()
+start_time = time.perf_counter()
+
+import os
+from dataclasses import replace
 from enum import Enum
 
-from small_world_network import SmallWorldNetwork
+from agent import Health, Group
+
+from simulation import SimulationConfig, EngineMode, build_world, run_simulation, setup
+
+from sweep import run_sweep
 
-from agent import Agent, Health, Group
+from layout import Layout, LayoutService
 
+from trajectory import TrajectoryWriter, to_dynamic_gexf
 
-class GroupBehavior:
+from results import SimulationResults
+
+from metrics import PhaseProfiler, PrintSink, JsonLinesSink
 
-    def __init__(self, type):
-        self.type = type
-        if type == Group.SKEPTICAL:
-            self.Ci = 1
-            self.Cv = skeptical_cost_vaccination
-        elif type == Group.TRUSTER:
-            self.Ci = 1
-            self.Cv = truster_cost_vaccination
 
 class PlotMode(Enum):
     # generates a mp4 and a plot with all (sub) health states
@@ -29,417 +29,255 @@ class PlotMode(Enum):
     ONLYPLOT = 1
     # plots the average vaccination amount with different group percentages over multiple runs against each other
     VACCIPLOT = 2
+    # runs the simulation without matplotlib and stores the results in simulation.npz, e.g. for batch jobs on a cluster
+    HEADLESS = 3
 
 """
 START changable variables
 """
 
-# set the cost of vaccination for the specific groups
-truster_cost_vaccination = 0.1
-skeptical_cost_vaccination = 0.2
-
-
-# define what the output should look like
+# define what the output should look like, matplotlib is only imported if mode plots something
 mode = PlotMode.MP4PLOT
-# expected number of nodes of the network on which the simulation runs on
-n = 1000
 
-# percentage of Trusters and Skepticals in the network
-#                   Trust Skept
-group_percentages = [0.5, 0.5]
+config = SimulationConfig(
+    # expected number of nodes of the network on which the simulation runs on
+    n=1000,
+
+    # percentage of Trusters and Skepticals in the network
+    #                  Trust Skept
+    group_percentages=[0.5, 0.5],
 
-# number of initial neighbors when creating a group graph / watts_strogatz_graph
-k = 8
+    # number of initial neighbors when creating a group graph / watts_strogatz_graph
+    k=8,
 
-# probability for every edge that it is relinked (in a group graph)
-change_edge_percentage = 0.2
+    # probability for every edge that it is relinked (in a group graph)
+    change_edge_percentage=0.2,
 
-# number of edges that are added between two different groups i, j is alpha * ([number of nodes in i] + [number of nodes in j])
-alpha = 0.05
+    # number of edges that are added between two different groups i, j is alpha * ([number of nodes in i] + [number of nodes in j])
+    alpha=0.05,
 
-# how far agents look into the future when deciding to vaccinate (days)
-Agent.T = 5
+    # how far agents look into the future when deciding to vaccinate (days)
+    T=5,
 
-# same length as group_percentages, define the group of every initial graph
-groups = [Group.TRUSTER, Group.SKEPTICAL]
-# same length as group_percentages, define the believes of every group
+    # same length as group_percentages, define the group of every initial graph
+    groups=[Group.TRUSTER, Group.SKEPTICAL],
 
-group_behaviours = [GroupBehavior(Group.TRUSTER), GroupBehavior(Group.SKEPTICAL)]
+    # set the cost of vaccination for the specific groups
+    #                  Trust Skept
+    vaccination_costs=[0.1, 0.2],
 
-# initially infected
-#                   Trust   Skept
-lim_init_infected = [0.005, 0.005]
+    # initially infected
+    #                  Trust   Skept
+    lim_init_infected=[0.005, 0.005],
 
-# initially vaccinated
-#                 Trust  Skept
-lim_init_vacci = [0.005, 0.005]
+    # initially vaccinated
+    #               Trust  Skept
+    lim_init_vacci=[0.005, 0.005],
 
+    # change the depth of view the agents use to estimate their chance of getting infected, 1 => direct neighbors, 2 => neighbors of neighbors
+    depth=1,
 
+    # infection rate / probability that a person infects its neighbor
+    beta=0.05,
 
+    # number of iterations of the simulation
+    frames=100,
 
-# change the depth of view the agents use to estimate their chance of getting infected, 1 => direct neighbors, 2 => neighbors of neighbors
-depth = 1
+    # define how the agents are simulated
+    engine=EngineMode.AGENT,
 
-# infection rate / probability that a person infects its neighbor
-Agent.beta = 0.05
+    # seed of all random numbers, the same seed reproduces the same results, None => different results every run
+    seed=None,
 
-# number of iterations of the simulation
-frames = 100
+    # generated networks are stored here and reused by runs with the same seed and network parameters, None => off
+    network_cache=os.path.join("cache", "networks"),
+)
 
 # frames per second of the simulation
 fps = 4
 
-"""
-END changable variables
-"""
-
-agents = list()
-
-age_mu = 40
-age_sigma = 15
-
-
-def setup():
-    global agents
-    agents = []
-    print
-    G = SmallWorldNetwork(n, group_percentages, alpha, k, change_edge_percentage, depth)
-
-    # Create Agent for every node
-    for i in G.network.nodes:
-        age = np.random.normal(age_mu, age_sigma)
-
-        group_id = G.group_colors[i] % 2
-        group = groups[group_id]
-
-        status = Health.SUSCEPTIBLE
-
-        init_status_p = np.random.uniform(0.0, 1.0)
-
-        if init_status_p <= lim_init_infected[group_id]:
-            status = Health.INFECTED
-        elif init_status_p <= lim_init_vacci[group_id]:
-            status = Health.VACCINATED
+# positions of the nodes in the mp4, Layout.SPRING or Layout.GROUP_RINGS (much faster for large networks)
+layout = Layout.SPRING
 
-        agent = Agent(i, age, status, group)
-        agents.append(agent)
+# measure the time of every phase of every day (look, act, update, drawing, ...), written to profile.json
+profile = False
 
-    return G
+# receives the progress and the metrics, PrintSink() prints them, JsonLinesSink("metrics.jsonl") writes them as JSON lines
+sink = PrintSink()
 
+# VACCIPLOT: simulate all simulations of a percentage together on one network (ensemble_engine.py), much faster but all
+# simulations of a percentage share the network, only their initial population and their days are different
+ensemble = False
 
-def simulate(world: SmallWorldNetwork, group_behaviours, agents):
-    for i in world.network.nodes:
-        agents[i].run(group_behaviours, world.network.neighbors(i), world.depth_neighbors[i], agents)
+# VACCIPLOT: engine of the simulations, the sweep only needs the counts, so a vectorized engine is much faster than
+# the engine of config
+sweep_engine = EngineMode.VECTORIZED
 
-    for i in world.network.nodes:
-        agents[i].update()
+"""
+END changable variables
+"""
 
 
-def count_status(agents):
+def export(trajectory_path, v):
     """
-    counts all health states in the network
-    :param agents:
-    :return:
+    converts the trajectory written by simulate_export() into a dynamic gexf file for Gephi
     """
-    num_inf = 0
-    num_sus = 0
-    num_rec = 0
-    num_vac = 0
-    num_vacT = 0
-    num_vacS = 0
-    num_infT = 0
-    num_infS = 0
-
-    for agent in agents:
-        if agent.get_health_status() == Health.INFECTED:
-            if agent._group == Group.TRUSTER:
-                num_infT += 1
-            if agent._group == Group.SKEPTICAL:
-                num_infS += 1
-            num_inf += 1
-        if agent.get_health_status() == Health.RECOVERED:
-            num_rec += 1
-        if agent.get_health_status() == Health.VACCINATED:
-            if agent._group == Group.TRUSTER:
-                num_vacT += 1
-            if agent._group == Group.SKEPTICAL:
-                num_vacS += 1
-            num_vac += 1
-        if agent.get_health_status() == Health.SUSCEPTIBLE:
-            num_sus += 1
-
-    Agent.num_inf = num_inf
-    Agent.num_sus = num_sus
-    Agent.num_vac = num_vac
-    Agent.num_rec = num_rec
-    Agent.num_vacT = num_vacT
-    Agent.num_vacS = num_vacS
-    Agent.num_infT = num_infT
-    Agent.num_infS = num_infS
-
-
-def export(net, agents, v):
-    # Color vertices
-
-    for i in net.nodes:
-        if agents[i].get_health_status() == Health.SUSCEPTIBLE:
-            net.nodes[i]['viz'] = {'color': {'r': 0, 'g': 255, 'b': 0, 'a': 1.0}}
-        if agents[i].get_health_status() == Health.INFECTED:
-            net.nodes[i]['viz'] = {'color': {'r': 255, 'g': 0, 'b': 0, 'a': 1.0}}
-        if agents[i].get_health_status() == Health.RECOVERED:
-            net.nodes[i]['viz'] = {'color': {'r': 0, 'g': 0, 'b': 0, 'a': 1.0}}
-        if agents[i].get_health_status() == Health.VACCINATED:
-            net.nodes[i]['viz'] = {'color': {'r': 0, 'g': 0, 'b': 255, 'a': 1.0}}
-
-        # Color edges
-        for e in net.edges:
-            net.edges[e]['viz'] = {'color': {'r': 220, 'g': 220, 'b': 220, 'a': 1.0}}
-
-        nx.write_gexf(net, "export/export-" + str(v) + ".gexf")
-
-
-def simulate_export():
-    timesteps = 120
-    save_after = 120
-
-    count_status(agents)
-    plot = [{} for i in range(timesteps)]
-    plot[0]['sus'] = Agent.num_sus
-    plot[0]['inf'] = Agent.num_inf
-    plot[0]['rec'] = Agent.num_rec
-    plot[0]['vac'] = Agent.num_vac
-    plot[0]['recvac'] = Agent.num_vac + Agent.num_rec
-    nx.write_gexf(world.network, "export/export-groups.gexf")
-    for i in range(timesteps):
-        print("simulated " + str(i))
-
-        # save?
-        # if i % save_after == 0:
-        #    export(world.network, agents, i)
-
-        simulate(world, group_behaviours, agents)
-        count_status(agents)
-        # plot
-        plot[i]['sus'] = Agent.num_sus
-        plot[i]['inf'] = Agent.num_inf
-        plot[i]['rec'] = Agent.num_rec
-        plot[i]['vac'] = Agent.num_vac
-        plot[i]['recvac'] = Agent.num_rec + Agent.num_vac
-    fig = plt.figure()
-    ax = fig.add_subplot(111, axisbelow=True)
-    ax.plot(range(timesteps), [elem['sus'] for elem in plot], 'green', lw=1.5, label="Susceptible")
-    ax.plot(range(timesteps), [elem['vac'] for elem in plot], 'blue', lw=1.5, label="Vaccinated")
-    ax.plot(range(timesteps), [elem['rec'] for elem in plot], 'orange', lw=1.5, label="Recovered")
-    ax.plot(range(timesteps), [elem['inf'] for elem in plot], 'red', lw=1.5, label="Infected")
-    ax.plot(range(timesteps), [elem['recvac'] for elem in plot], 'darkgrey', lw=1.5, label="Recovered or Vaccinated")
-    ax.set_ylim(0, world.network.number_of_nodes())
-    ax.set_xlim(0, timesteps)
-    plt.show()
+    to_dynamic_gexf(trajectory_path, "export/export-" + str(v) + ".gexf")
 
 
-def health2num(health):
+def create_profiler():
     """
-    :param health:
-    :return: num(health)
+    :return: PhaseProfiler if profile is set, else None
     """
-    if health == Health.SUSCEPTIBLE:
-        return 0
-    if health == Health.INFECTED:
-        return 1
-    if health == Health.RECOVERED:
-        return 2
-    if health == Health.VACCINATED:
-        return 3
+    return PhaseProfiler() if profile else None
 
 
-def generate_health_list(agents):
+def report_profile(profiler):
     """
-    iterate through all agends and generate a list infected where agent[i].infected == 1 <=> infected[i] == 1, else 0
+    writes the measured phases to profile.json and reports their totals
     """
-    infected = []
+    if profiler is not None:
+        profiler.write("profile.json")
+        sink.metric("phases", profiler.summary()["phases"])
 
-    for i in range(0, len(agents)):
-        infected.append(health2num(agents[i]._health))
-    return infected
 
-
-def health_list_to_color(health_list):
+def simulate_export(config, timesteps=120, save_gexf=False):
     """
-    convertss the health_list which is a list of integers to a list of strings, where the strings represent colors
-    SUSCEPTIBLE <-> yellow
-    INFECTED <->  red
-    RECOVERED <-> green
-    VACCINATED <-> navy
+    simulates timesteps days, stores them in export/trajectory.vnt and plots them
+    :param save_gexf: convert the trajectory to gexf for Gephi at the end?
     """
-    color_health_list = []
-    colors = ["yellow", "red", "green", "navy"]
-    for i in range(0, len(health_list)):
-        color_health_list.append(colors[health_list[i]])
-    return color_health_list
+    import matplotlib.pyplot as plt
 
+    profiler = create_profiler()
+    world, engine = setup(config, profiler=profiler)
 
-def split_groups(nodes, group_list, health_color):
-    """
-    Splits the list of nodes and health color into two different lists coressponding to their groups.
-    :param nodes:
-    :param group_list:
-    :param health_color:
-    :return: nodes0, nodes1, healh_color0, health_color1
-    """
-    health_color0 = []
-    health_color1 = []
-
-    nodes0 = []
-    nodes1 = []
-    for i in nodes:
-        if group_list[i] % 2 == 0:
-            health_color0.append(health_color[i])
-            nodes0.append(i)
-        else:
-            health_color1.append(health_color[i])
-            nodes1.append(i)
+    results = SimulationResults(timesteps, config.groups)
+    os.makedirs("export", exist_ok=True)
+    trajectory = TrajectoryWriter("export/trajectory.vnt", world, engine.health)
+    for i in range(timesteps):
+        engine.profiler.start_day(i)
+        engine.step()
+        t = engine.profiler.tick()
+        trajectory.append(i + 1, engine.health)
+        results.record(i, engine.counters.counts)
+        engine.profiler.record("record", t)
+        sink.progress("simulate", i + 1, timesteps)
+        if config.stop_early and engine.absorbing():
+            sink.metric("absorbing_frame", i)
+            results.fill(i)
+            if i + 1 < timesteps:
+                # a record without changes, so the trajectory still ends on the last day
+                trajectory.append(timesteps, engine.health)
+            break
+    trajectory.close()
+    report_profile(profiler)
+    if save_gexf:
+        export("export/trajectory.vnt", timesteps)
 
-    return nodes0, nodes1, health_color0, health_color1
+    fig = plt.figure()
+    ax = fig.add_subplot(111, axisbelow=True)
+    ax.plot(range(timesteps), results.count(Health.SUSCEPTIBLE), 'green', lw=1.5, label="Susceptible")
+    ax.plot(range(timesteps), results.count(Health.VACCINATED), 'blue', lw=1.5, label="Vaccinated")
+    ax.plot(range(timesteps), results.count(Health.RECOVERED), 'orange', lw=1.5, label="Recovered")
+    ax.plot(range(timesteps), results.count(Health.INFECTED), 'red', lw=1.5, label="Infected")
+    ax.plot(range(timesteps), results.count(Health.RECOVERED) + results.count(Health.VACCINATED), 'darkgrey', lw=1.5,
+            label="Recovered or Vaccinated")
+    ax.set_ylim(0, world.num_nodes)
+    ax.set_xlim(0, timesteps)
+    plt.show()
 
 
-def time_stamp(iteration):
+def simulate_animation(config, mode):
     """
-
-    :param iteration:
-    :return: void
+    Runs the simulation of config, for PlotMode.MP4PLOT every frame is drawn into simulation.mp4. Then plots the SIVR
+    time series.
+    :return: SimulationResults
     """
-    #print(iteration)
+    import matplotlib.pyplot as plt
 
-    global fig, agents, plot, vacci_plot
-    simulate(world, group_behaviours, agents)
-    #clears figure
+    world = build_world(config)
+    profiler = create_profiler()
 
     if mode == PlotMode.MP4PLOT:
-        fig.clf()
-
-        n0, n1, h0, h1 = split_groups(world.network, world.group_colors, generate_health_list(agents))
-
-        edges = nx.draw_networkx_edges(world.network, pos, width=0.1, edgelist=world.network.edges)
-
-        ch0 = health_list_to_color(h0)
-        ch1 = health_list_to_color(h1)
-        nodes0 = nx.draw_networkx_nodes(n0, pos, node_size=7, node_shape='^', nodelist=n0,
-                                        node_color=ch0, label='Trusters')
-        nodes1 = nx.draw_networkx_nodes(n1, pos, node_size=7, nodelist=n1, node_color=ch1, label='Skepticals')
-        plt.legend(scatterpoints=1)
-        legend_entries = [Line2D([0], [0], color="navy", marker='^', lw=0),
-                          Line2D([0], [0], color="navy", marker='o', lw=0),
-                          Line2D([0], [0], color="yellow", lw=2),
-                          Line2D([0], [0], color="red", lw=2),
-                          Line2D([0], [0], color="green", lw=2),
-                          Line2D([0], [0], color="navy", lw=2)]
-
-        plt.legend(legend_entries, ["Truster", "Skeptical", "Susceptible", "Infected", "Recovered", "Vaccinated"])
-
-    if mode == PlotMode.MP4PLOT or mode == PlotMode.ONLYPLOT:
-        i = iteration
-        count_status(agents)
-        plot[i]['sus'] = Agent.num_sus
-        plot[i]['inf'] = Agent.num_inf
-        plot[i]['rec'] = Agent.num_rec
-        plot[i]['vac'] = Agent.num_vac
-        plot[i]['vacT'] = Agent.num_vacT
-        plot[i]['vacS'] = Agent.num_vacS
-        plot[i]['infT'] = Agent.num_infT
-        plot[i]['infS'] = Agent.num_infS
-        plot[i]['recvac'] = Agent.num_rec + Agent.num_vac
-
-    if mode == PlotMode.VACCIPLOT:
-        i = iteration
-        count_status(agents)
-        vacci_plot[vacci_iteration][i] += Agent.num_vac
-        vacci_plot_truster[vacci_iteration][i] += Agent.num_vacT
-
-
-    return world.network
-
-def group_neighbors():
-    pass
+        from matplotlib.animation import FFMpegWriter
+        from renderer import NetworkRenderer
+
+        fig = plt.figure(dpi=300)
+
+        # compute the position of all nodes in the network, or load them from the cache
+        pos = LayoutService().layout(world, layout, config.seed)
+        renderer = NetworkRenderer(fig, world, pos)
+        writer = FFMpegWriter(fps=fps, extra_args=['-vcodec', 'libx264'])
+
+        def time_stamp(iteration, world, engine):
+            t = engine.profiler.tick()
+            renderer.update(engine.health)
+            t = engine.profiler.record("render", t)
+            writer.grab_frame()
+            engine.profiler.record("grab_frame", t)
+
+        with writer.saving(fig, 'simulation.mp4', dpi=300):
+            results = run_simulation(config, world, on_frame=time_stamp, profiler=profiler, sink=sink)
+        plt.close(fig)
+    else:
+        results = run_simulation(config, world, profiler=profiler, sink=sink)
+    report_profile(profiler)
+
+    frames = config.frames
+    fig2 = plt.figure()
+    fig2.clf()
+    ax = fig2.add_subplot(111, axisbelow=True)
+    plt.title("SIVR")
+    plt.ylabel("agents")
+    plt.xlabel("iterations")
+    results.save('simulation.npz')
+    ax.plot(range(frames), results.count(Health.SUSCEPTIBLE), 'yellow', lw=1.5, label="Susceptible")
+    ax.plot(range(frames), results.count(Health.VACCINATED), 'navy', lw=1.5, label="Vaccinated")
+    ax.plot(range(frames), results.count(Health.VACCINATED, Group.TRUSTER), 'skyblue', lw=1.5,
+            label="Vaccinated Truster")
+    ax.plot(range(frames), results.count(Health.VACCINATED, Group.SKEPTICAL), 'cyan', lw=1.5,
+            label="Vaccinated Skeptical")
+    ax.plot(range(frames), results.count(Health.RECOVERED), 'green', lw=1.5, label="Recovered")
+    ax.plot(range(frames), results.count(Health.INFECTED), 'red', lw=1.5, label="Infected")
+    ax.plot(range(frames), results.count(Health.INFECTED, Group.TRUSTER), 'tomato', lw=1.5,
+            label="Infected Truster")
+    ax.plot(range(frames), results.count(Health.INFECTED, Group.SKEPTICAL), 'pink', lw=1.5,
+            label="Infected Skeptical")
+    ax.plot(range(frames), results.count(Health.RECOVERED) + results.count(Health.VACCINATED), 'darkgrey', lw=1.5,
+            label="Recovered or Vaccinated")
+    ax.set_ylim(0, world.num_nodes)
+    ax.set_xlim(0, frames)
+    plt.legend()
+    plt.show()
+    return results
 
 
-def simulate_animation():
-    """
-    Create a FuncAnimation which draws on fig, calls the function time_stamp every iteration to update the simulation.
-    :return: void
-    """
-    global fig
-    ani = FuncAnimation(fig, time_stamp, frames=frames)
-    ani.save('simulation.mp4', fps=fps, extra_args=['-vcodec', 'libx264'])
-
-    plt.close()
-    if mode == PlotMode.MP4PLOT or mode == PlotMode.ONLYPLOT:
-        fig2 = plt.figure()
-        fig2.clf()
-        ax = fig2.add_subplot(111, axisbelow=True)
-        plt.title("SIVR")
-        plt.ylabel("agents")
-        plt.xlabel("iterations")
-        print(plot)
-        ax.plot(range(frames), [elem['sus'] for elem in plot], 'yellow', lw=1.5, label="Susceptible")
-        ax.plot(range(frames), [elem['vac'] for elem in plot], 'navy', lw=1.5, label="Vaccinated")
-        ax.plot(range(frames), [elem['vacT'] for elem in plot], 'skyblue', lw=1.5, label="Vaccinated Truster")
-        ax.plot(range(frames), [elem['vacS'] for elem in plot], 'cyan', lw=1.5, label="Vaccinated Skeptical")
-        ax.plot(range(frames), [elem['rec'] for elem in plot], 'green', lw=1.5, label="Recovered")
-        ax.plot(range(frames), [elem['inf'] for elem in plot], 'red', lw=1.5, label="Infected")
-        ax.plot(range(frames), [elem['infT'] for elem in plot], 'tomato', lw=1.5, label="Infected Truster")
-        ax.plot(range(frames), [elem['infS'] for elem in plot], 'pink', lw=1.5, label="Infected Skeptical")
-        ax.plot(range(frames), [elem['recvac'] for elem in plot], 'darkgrey', lw=1.5, label="Recovered or Vaccinated")
-        ax.set_ylim(0, world.network.number_of_nodes())
-        ax.set_xlim(0, frames)
-        plt.legend()
-        plt.show()
-
-
-if mode == PlotMode.MP4PLOT or mode == PlotMode.ONLYPLOT:
-
-    fig = plt.figure(dpi=300)
-
-    world = setup()
-    plot = [{} for i in range(frames)]
-
-    # compute the position of all nodes in the network
-    pos = nx.spring_layout(world.network)
-
-    # start the animation
-    simulate_animation()
-
-if mode == PlotMode.VACCIPLOT:
+def vacci_plot_sweep(config, simulations_per_percentage=20, start=0.1, step=0.2, end=0.9, processes=None,
+                     ensemble=False, engine=None):
     """
     plot the average vaccination levels of different group_percentages over tries_per_percentage against each other.
     only works for two groups, currently with Trusters as group one and Skepticals as the second group
     start with the percentages start for the first group and (1 - start) for the second
     then increment start by step and do the same as above, repeat aslong <= end
+    :param processes: number of processes running the simulations in parallel, None => one for every core
+    :param ensemble: simulate all simulations of a percentage together on one network, see ensemble_engine.py
+    :param engine: EngineMode of the simulations, config.engine if None
     """
-    fig = plt.figure(dpi=300)
-    plot = [{} for i in range(frames)]
-    vacci_iteration = 0
-    simulations_per_percentage = 20
-    start = 0.1
-    step = 0.2
-    end = 0.9
+    import matplotlib.pyplot as plt
+
+    if engine is not None:
+        config = replace(config, engine=engine)
+
+    frames = config.frames
     total_vacci_iterations = int((end - start) / step + 1)
-    print(total_vacci_iterations)
-    vacci_plot = [[0 for i in range(frames)] for i in range(total_vacci_iterations)]
-    vacci_plot_truster = [[0 for i in range(frames)] for i in range(total_vacci_iterations)]
+    sink.metric("total_vacci_iterations", total_vacci_iterations)
 
     """
-    simulate all
+    simulate all, every simulation on its own process, see sweep.py
     """
-    for vacci_iteration in range(total_vacci_iterations):
-        group_percentage_left = round(start + vacci_iteration * step, 1)
-        print(str(group_percentage_left) + " Truster", vacci_iteration)
-        group_percentages[0] = group_percentage_left
-        group_percentages[1] = round(1 - group_percentage_left, 1)
-
-        for try_iteration in range(simulations_per_percentage):
-            print(str(group_percentage_left), "simulation:", try_iteration)
-            world = setup()
-            simulate_animation()
+    percentages = [round(start + vacci_iteration * step, 1) for vacci_iteration in range(total_vacci_iterations)]
+    vacci_results = run_sweep(config, percentages, simulations_per_percentage, processes=processes, sink=sink,
+                              ensemble=ensemble)
 
     vacci_colors = ["red", "yellow", "green", "aqua", "navy"]
 
@@ -450,7 +288,7 @@ if mode == PlotMode.VACCIPLOT:
     fig3 = plt.figure()
     fig3.clf()
     ax = fig3.add_subplot(111, axisbelow=True)
-    ax.set_ylim(0, world.network.number_of_nodes())
+    ax.set_ylim(0, config.n)
     ax.set_xlim(0, frames)
     plt.ylabel("vaccinated agents")
     plt.xlabel("iteration")
@@ -459,16 +297,14 @@ if mode == PlotMode.VACCIPLOT:
     tvac_div_by_svac = [0 for i in range(total_vacci_iterations)]
 
     for vacci_iteration in range(total_vacci_iterations):
+        vacci_plot = vacci_results[vacci_iteration].count(Health.VACCINATED)
+        vacci_plot_truster = vacci_results[vacci_iteration].count(Health.VACCINATED, Group.TRUSTER)
 
-        for i in range(frames):
-            vacci_plot[vacci_iteration][i] /= simulations_per_percentage
-            vacci_plot_truster[vacci_iteration][i] /= simulations_per_percentage
-
-        tvac_div_by_svac[vacci_iteration] = vacci_plot_truster[vacci_iteration][frames - 1] / (vacci_plot[vacci_iteration][frames - 1] - vacci_plot_truster[vacci_iteration][frames - 1])
+        tvac_div_by_svac[vacci_iteration] = float(vacci_plot_truster[frames - 1] / (vacci_plot[frames - 1] - vacci_plot_truster[frames - 1]))
 
         group_percentage_left = round(start + vacci_iteration * step, 1)
         group_percentage_right = round(1 - group_percentage_left, 1)
-        ax.plot(range(frames), vacci_plot[vacci_iteration], vacci_colors[vacci_iteration], lw=1.5, label=str(group_percentage_left) + " Truster - " + str(group_percentage_right) + " Skeptical" )
+        ax.plot(range(frames), vacci_plot, vacci_colors[vacci_iteration], lw=1.5, label=str(group_percentage_left) + " Truster - " + str(group_percentage_right) + " Skeptical" )
 
     plt.legend()
     plt.show()
@@ -482,10 +318,44 @@ if mode == PlotMode.VACCIPLOT:
     plt.title("vaccination ratio between trusters and skepticals")
     xvals = [(start + i * step) for i in range(total_vacci_iterations)]
 
-    print(xvals)
-    print(tvac_div_by_svac)
+    sink.metric("truster_percentages", xvals)
+    sink.metric("tvac_div_by_svac", tvac_div_by_svac)
 
     ax.plot(xvals, tvac_div_by_svac, 'navy', lw=1.5, label="(#truster vaccinations) / (#skeptical vaccinations) with #truster = (p * #agents)")
 
     plt.legend()
     plt.show()
+
+
+def simulate_headless(config):
+    """
+    Runs the simulation of config without plotting, stores the results in simulation.npz and prints the final counts
+    :return: SimulationResults
+    """
+    profiler = create_profiler()
+    simulation_start = time.perf_counter()
+    results = run_simulation(config, profiler=profiler, sink=sink)
+    sink.metric("simulation_seconds", time.perf_counter() - simulation_start)
+    report_profile(profiler)
+
+    results.save('simulation.npz')
+    for health in Health:
+        sink.metric(health.name, int(results.count(health)[-1]))
+    return results
+
+
+def main():
+    sink.metric("startup_seconds", time.perf_counter() - start_time)
+
+    if mode == PlotMode.HEADLESS:
+        simulate_headless(config)
+
+    if mode == PlotMode.MP4PLOT or mode == PlotMode.ONLYPLOT:
+        simulate_animation(config, mode)
+
+    if mode == PlotMode.VACCIPLOT:
+        vacci_plot_sweep(config, ensemble=ensemble, engine=sweep_engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import json
+import time
+
+
+class PhaseProfiler:
+
+    """
+    Accumulates the time and the number of calls of every phase of a simulation (e.g. the look() of the infection,
+    act(), drawing a frame), in total and for every day. A phase is measured between two calls:
+
+        t = profiler.tick()
+        ...  # the phase
+        t = profiler.record("act", t)
+
+    NullProfiler has the same methods doing nothing, so the engines call them unconditionally.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.day = 0
+        # totals[phase] = [seconds, calls]
+        self.totals = {}
+        # days[d][phase] = [seconds, calls] of day d
+        self.days = [{}]
+
+    def start_day(self, day):
+        """
+        all following phases are counted for day day
+        """
+        self.day = day
+        while len(self.days) <= day:
+            self.days.append({})
+
+    @staticmethod
+    def tick():
+        return time.perf_counter()
+
+    def record(self, phase, start):
+        """
+        adds the time since start to phase
+        :return: now, the start of the next phase
+        """
+        now = time.perf_counter()
+        for entries in (self.totals, self.days[self.day]):
+            entry = entries.get(phase)
+            if entry is None:
+                entries[phase] = [now - start, 1]
+            else:
+                entry[0] += now - start
+                entry[1] += 1
+        return now
+
+    def summary(self):
+        """
+        :return: dict with the total seconds and calls of every phase and the seconds of every phase on every day
+        """
+        return {
+            "phases": {phase: {"seconds": seconds, "calls": calls} for phase, (seconds, calls) in self.totals.items()},
+            "days": [{phase: seconds for phase, (seconds, calls) in day.items()} for day in self.days],
+        }
+
+    def write(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.summary(), file, indent=2)
+
+
+class NullProfiler:
+
+    """
+    PhaseProfiler that measures nothing, the default of the engines
+    """
+    enabled = False
+
+    def start_day(self, day):
+        pass
+
+    @staticmethod
+    def tick():
+        return 0.0
+
+    def record(self, phase, start):
+        return 0.0
+
+
+class PrintSink:
+
+    """
+    Receives the progress and the metrics of a simulation and prints them
+    """
+    def progress(self, task, done, total):
+        print("%s %d/%d" % (task, done, total))
+
+    def metric(self, name, value):
+        print(name + ": " + str(value))
+
+
+class JsonLinesSink:
+
+    """
+    Writes every progress update and metric as one JSON object per line to path, e.g. for cluster jobs
+    """
+    def __init__(self, path):
+        self.file = open(path, 'a')
+
+    def write(self, record):
+        record["time"] = time.time()
+        self.file.write(json.dumps(record, default=str) + "\n")
+        self.file.flush()
+
+    def progress(self, task, done, total):
+        self.write({"type": "progress", "task": task, "done": done, "total": total})
+
+    def metric(self, name, value):
+        self.write({"type": "metric", "name": name, "value": value})
+
+    def close(self):
+        self.file.close()
+
+
+class NullSink:
+
+    """
+    Ignores everything, the default of run_simulation() and run_sweep()
+    """
+    def progress(self, task, done, total):
+        pass
+
+    def metric(self, name, value):
+        pass
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+from small_world_network import SmallWorldNetwork
+
+
+class NetworkStore:
+
+    """
+    Saves generated SmallWorldNetworks on disk, keyed by everything the network depends on (n, group_percentages, k, p,
+    alpha, mixing, depth, network_seed or seed), so the same network is only generated once, also across runs and worker
+    processes.
+    Every network is a directory of .npy files (CSR arrays, depth CSR arrays, group_colors, groups_translation) that are
+    loaded as read-only memory maps, so all processes using the same network share its pages and nothing is copied.
+    The total size of the store is bounded by max_bytes, the least recently used networks are deleted first.
+    """
+
+    arrays = ["indptr", "indices", "depth_indptr", "depth_indices", "group_colors", "groups_translation"]
+
+    def __init__(self, cache_dir=os.path.join("cache", "networks"), max_bytes=2**30):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(config):
+        """
+        :return: hash of all parameters of config the network depends on, None if config.seed gives a different network
+        every time
+        """
+        seed = config.network_seed if config.network_seed is not None else config.seed
+        if isinstance(seed, np.random.SeedSequence):
+            seed = (seed.entropy, seed.spawn_key)
+        elif seed is None or not isinstance(seed, (int, np.integer)):
+            return None
+        else:
+            seed = int(seed)
+
+        mixing = None if config.mixing is None else np.asarray(config.mixing, dtype=float).tolist()
+        parameters = (config.n, [float(percentage) for percentage in config.group_percentages], config.k,
+                      float(config.change_edge_percentage), float(config.alpha), mixing, config.depth, seed)
+        return hashlib.sha1(repr(parameters).encode()).hexdigest()
+
+    def network(self, config, build):
+        """
+        :param build: function returning the SmallWorldNetwork of config, called if it is not in the store
+        :return: SmallWorldNetwork of config, backed by read-only memory maps if it could be stored
+        """
+        key = self.key(config)
+        if key is None:
+            return build()
+
+        path = os.path.join(self.cache_dir, key)
+        try:
+            if not os.path.isdir(path):
+                self.save(path, build())
+                self.evict(keep=path)
+
+            # the modification time is the last use, for the LRU eviction
+            os.utime(path)
+            return self.load(path)
+        except FileNotFoundError:
+            # another process evicted the network before it was loaded
+            return build()
+
+    def save(self, path, world):
+        """
+        Writes the arrays of world into a temporary directory that is renamed to path, so other processes never see a
+        half written network
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temporary = path + ".tmp-" + str(os.getpid())
+        os.makedirs(temporary, exist_ok=True)
+        for name in self.arrays:
+            np.save(os.path.join(temporary, name + ".npy"), np.asarray(getattr(world, name)))
+        try:
+            os.rename(temporary, path)
+        except OSError:
+            # another process stored the same network first
+            shutil.rmtree(temporary, ignore_errors=True)
+
+    def load(self, path):
+        arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode='r') for name in self.arrays}
+        return SmallWorldNetwork.from_arrays(**arrays)
+
+    def evict(self, keep=None):
+        """
+        Deletes the least recently used networks (except keep) until the store is not larger than max_bytes
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(path) or ".tmp-" in name:
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+                entries.append((os.stat(path).st_mtime, path, size))
+            except FileNotFoundError:
+                # evicted by another process
+                continue
+            total += size
+
+        for mtime, path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
@@ -0,0 +1,29 @@
+import numpy as np
+
+from agent import Health
+
+
+def create_population(world, groups, lim_init_infected, lim_init_vacci, age_mu, age_sigma, rng):
+    """
+    Draws the age and the initial health of an agent for every node of world, for all agents at once.
+    :param groups: groups[i] is the Group of the agents with group id i
+    :param lim_init_infected: lim_init_infected[i] is the probability that an agent of group id i is initially infected
+    :param lim_init_vacci: lim_init_vacci[i] - lim_init_infected[i] is the probability that an agent of group id i is
+    initially vaccinated
+    :param rng: numpy.random.Generator
+    :return: ages, health values (int8), group ids (int8), one for every node
+    """
+    ages = rng.normal(age_mu, age_sigma, world.num_nodes)
+
+    group_ids = (np.asarray(world.group_colors) % len(groups)).astype(np.int8)
+
+    statuses = np.full(world.num_nodes, Health.SUSCEPTIBLE.value, dtype=np.int8)
+
+    init_status_p = rng.random(world.num_nodes)
+
+    infected = init_status_p <= np.asarray(lim_init_infected)[group_ids]
+    vaccinated = ~infected & (init_status_p <= np.asarray(lim_init_vacci)[group_ids])
+    statuses[infected] = Health.INFECTED.value
+    statuses[vaccinated] = Health.VACCINATED.value
+
+    return ages, statuses, group_ids
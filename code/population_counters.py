@@ -0,0 +1,39 @@
+import numpy as np
+
+from agent import Health
+
+
+class PopulationCounters:
+
+    """
+    Number of agents for every pair (health, group id), counts[health.value, group_id]. Instead of counting all agents
+    again every frame, the simulation tells the counters about every state transition with change(), so keeping them up
+    to date costs O(number of transitions). Works with any number of groups.
+    """
+    def __init__(self, health, group, num_groups):
+        """
+        :param health: health value of every agent
+        :param group: group id of every agent, 0 <= group id < num_groups
+        """
+        self.counts = np.zeros((len(Health), num_groups), dtype=np.int64)
+        np.add.at(self.counts, (health, group), 1)
+
+    def change(self, groups, old_health, new_health):
+        """
+        :param groups: group ids of the agents that changed their health
+        :param old_health: Health they had
+        :param new_health: Health they have now
+        """
+        if len(groups) == 0:
+            return
+        changed = np.bincount(groups, minlength=self.counts.shape[1])
+        self.counts[old_health.value] -= changed
+        self.counts[new_health.value] += changed
+
+    def count(self, health, groups=None):
+        """
+        :return: number of agents with the Health health, only of the group ids in groups if given
+        """
+        if groups is None:
+            return int(self.counts[health.value].sum())
+        return int(self.counts[health.value, groups].sum())
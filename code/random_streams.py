@@ -0,0 +1,30 @@
+import numpy as np
+
+
+class RandomStreams:
+
+    """
+    All random numbers of a simulation come from one seed: the seed is split with numpy's SeedSequence into independent
+    numpy.random.Generator streams for the construction of the network, the initial population and the simulation steps.
+    The same seed reproduces the same run, seed=None draws a fresh seed from the OS.
+    """
+    def __init__(self, seed=None):
+        if isinstance(seed, np.random.SeedSequence):
+            # a copy, spawning from the given SeedSequence would change it, so the same seed would give other streams
+            # the next time
+            self.seed_sequence = np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key,
+                                                        pool_size=seed.pool_size,
+                                                        n_children_spawned=seed.n_children_spawned)
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+
+        network, population, step = self.seed_sequence.spawn(3)
+        self.network = np.random.default_rng(network)
+        self.population = np.random.default_rng(population)
+        self.step = np.random.default_rng(step)
+
+    def spawn(self, num_streams):
+        """
+        :return: num_streams new independent RandomStreams, e.g. one for every repetition of a simulation
+        """
+        return [RandomStreams(seed) for seed in self.seed_sequence.spawn(num_streams)]
@@ -0,0 +1,67 @@
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.lines import Line2D
+
+
+class NetworkRenderer:
+
+    """
+    Draws the network for the animation. The edges and the positions of the nodes never change, so the edges are drawn
+    once and the nodes are two scatter collections (triangles for trusters, circles for skepticals) that are kept for the
+    whole animation. Every frame only writes the face colors of the nodes, which costs O(n).
+    """
+
+    # color of every health state, colors[health value]
+    # SUSCEPTIBLE <-> yellow
+    # INFECTED <->  red
+    # RECOVERED <-> green
+    # VACCINATED <-> navy
+    colors = ["yellow", "red", "green", "navy"]
+
+    def __init__(self, fig, world, pos):
+        """
+        :param fig: figure to draw on
+        :param world: SmallWorldNetwork
+        :param pos: pos[i] is the position (x, y) of node i
+        """
+        self.color_table = to_rgba_array(self.colors)
+        positions = np.array([pos[i] for i in range(world.num_nodes)])
+
+        ax = fig.add_subplot(111)
+        ax.tick_params(axis='both', which='both', bottom=False, left=False, labelbottom=False, labelleft=False)
+
+        # every edge once, from the lower to the higher node
+        sources = np.repeat(np.arange(world.num_nodes), np.diff(world.indptr))
+        lower = sources < world.indices
+        segments = np.stack((positions[sources[lower]], positions[world.indices[lower]]), axis=1)
+        ax.add_collection(LineCollection(segments, linewidths=0.1, colors='k', zorder=1))
+
+        # group 0 are the trusters, group 1 the skepticals
+        group_list = np.asarray(world.group_colors)
+        self.nodes0 = np.flatnonzero(group_list % 2 == 0)
+        self.nodes1 = np.flatnonzero(group_list % 2 == 1)
+        self.scatter0 = ax.scatter(positions[self.nodes0, 0], positions[self.nodes0, 1], s=7, marker='^', zorder=2,
+                                   label='Trusters')
+        self.scatter1 = ax.scatter(positions[self.nodes1, 0], positions[self.nodes1, 1], s=7, marker='o', zorder=2,
+                                   label='Skepticals')
+        ax.autoscale_view()
+
+        legend_entries = [Line2D([0], [0], color="navy", marker='^', lw=0),
+                          Line2D([0], [0], color="navy", marker='o', lw=0),
+                          Line2D([0], [0], color="yellow", lw=2),
+                          Line2D([0], [0], color="red", lw=2),
+                          Line2D([0], [0], color="green", lw=2),
+                          Line2D([0], [0], color="navy", lw=2)]
+        ax.legend(legend_entries, ["Truster", "Skeptical", "Susceptible", "Infected", "Recovered", "Vaccinated"])
+
+    def update(self, health):
+        """
+        Colors the nodes with their health
+        :param health: health value of every node
+        :return: the changed artists
+        """
+        node_colors = self.color_table[np.asarray(health)]
+        self.scatter0.set_facecolors(node_colors[self.nodes0])
+        self.scatter1.set_facecolors(node_colors[self.nodes1])
+        return self.scatter0, self.scatter1
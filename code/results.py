@@ -0,0 +1,68 @@
+import numpy as np
+
+from agent import Health, Group
+
+
+class SimulationResults:
+
+    """
+    Time series of a simulation: counts[frame, health value, group id] is the number of agents with that health in that
+    group after the frame. The array is allocated once, so plotting and averaging over simulations are slicing
+    operations, and it can be saved to and loaded from a .npz file.
+    """
+    def __init__(self, frames, groups, counts=None):
+        """
+        :param groups: groups[i] is the Group of the agents with group id i
+        :param counts: initial counts, zeros if None
+        """
+        self.groups = groups
+        if counts is None:
+            counts = np.zeros((frames, len(Health), len(groups)), dtype=np.int64)
+        self.counts = counts
+
+    @property
+    def frames(self):
+        return self.counts.shape[0]
+
+    def record(self, frame, counts):
+        """
+        :param counts: counts[health value, group id] of the frame, see PopulationCounters
+        """
+        self.counts[frame] = counts
+
+    def fill(self, frame):
+        """
+        Copies the counts of frame into all later frames, for a simulation that stopped in an absorbing state after frame
+        """
+        self.counts[frame + 1:] = self.counts[frame]
+
+    def group_ids(self, group):
+        """
+        :return: all group ids with the Group group
+        """
+        return [i for i in range(0, len(self.groups)) if self.groups[i] == group]
+
+    def count(self, health, group=None):
+        """
+        :return: number of agents with the Health health of every frame, only of the Group group if given
+        """
+        if group is None:
+            return self.counts[:, health.value, :].sum(axis=1)
+        return self.counts[:, health.value, self.group_ids(group)].sum(axis=1)
+
+    @staticmethod
+    def mean(results):
+        """
+        :return: SimulationResults with the average counts of a list of SimulationResults of the same shape
+        """
+        return SimulationResults(results[0].frames, results[0].groups,
+                                 np.mean([result.counts for result in results], axis=0))
+
+    def save(self, path):
+        np.savez(path, counts=self.counts, groups=np.array([group.value for group in self.groups]))
+
+    @staticmethod
+    def load(path):
+        data = np.load(path)
+        groups = [Group(value) for value in data['groups']]
+        return SimulationResults(data['counts'].shape[0], groups, data['counts'])
@@ -0,0 +1,279 @@
+from dataclasses import dataclass, field
+from enum import Enum
+
+import numpy as np
+
+from agent import Agent, Health, Group, GroupBehavior
+from ensemble_engine import EnsembleEngine
+from population import create_population
+from metrics import NullProfiler, NullSink
+from network_store import NetworkStore
+from population_counters import PopulationCounters
+from random_streams import RandomStreams
+from results import SimulationResults
+from small_world_network import SmallWorldNetwork
+from vectorized_engine import VectorizedEngine
+
+
+class EngineMode(Enum):
+    # calls Agent.run() and Agent.update() for every agent
+    AGENT = 0
+    # simulates all agents at once with numpy arrays, see vectorized_engine.py
+    VECTORIZED = 1
+    # same as VECTORIZED, but the infected neighbors are only counted again for agents next to a transition
+    INCREMENTAL = 2
+
+
+@dataclass
+class SimulationConfig:
+
+    """
+    All parameters of a simulation, see the README for their meaning
+    """
+    # expected number of nodes of the network on which the simulation runs on
+    n: int = 1000
+    # group_percentages[i] * n agents are in group i
+    group_percentages: list = field(default_factory=lambda: [0.5, 0.5])
+    # number of initial neighbors when creating a group graph / watts_strogatz_graph
+    k: int = 8
+    # probability for every edge that it is relinked (in a group graph)
+    change_edge_percentage: float = 0.2
+    # number of edges that are added between two different groups i, j is alpha * (|i| + |j|)
+    alpha: float = 0.05
+    # None or a symmetric matrix with one row and column for every group, mixing[i][j] replaces alpha for groups i, j
+    mixing: list = None
+    # depth of view the agents use to estimate their chance of getting infected
+    depth: int = 1
+    # infection rate / probability that a person infects its neighbor
+    beta: float = 0.05
+    # how far agents look into the future when deciding to vaccinate (days)
+    T: int = 5
+    # discount rate
+    r: float = 0.01
+    # number of iterations of the simulation
+    frames: int = 100
+    # same length as group_percentages, the Group of every group
+    groups: list = field(default_factory=lambda: [Group.TRUSTER, Group.SKEPTICAL])
+    # same length as groups, the cost of vaccination and of an infection for every group
+    vaccination_costs: list = field(default_factory=lambda: [0.1, 0.2])
+    infection_costs: list = field(default_factory=lambda: [1, 1])
+    # same length as groups, probability of being initially infected / vaccinated
+    lim_init_infected: list = field(default_factory=lambda: [0.005, 0.005])
+    lim_init_vacci: list = field(default_factory=lambda: [0.005, 0.005])
+    age_mu: float = 40
+    age_sigma: float = 15
+    engine: EngineMode = EngineMode.VECTORIZED
+    # seed of all random numbers (int, numpy.random.SeedSequence or None for a different simulation every time)
+    seed: object = None
+    # seed of the network only, None => the network stream of seed, simulations with the same network_seed (and network
+    # parameters) run on the same network but with their own population and steps
+    network_seed: object = None
+    # stop simulating when no agent can change its health any more and repeat the last counts for the remaining frames
+    stop_early: bool = True
+    # directory of a NetworkStore that keeps the generated networks, None => always generate the network, only used
+    # with a seed
+    network_cache: str = None
+
+    def group_behaviours(self):
+        return [GroupBehavior(self.groups[i], self.vaccination_costs[i], self.infection_costs[i])
+                for i in range(len(self.groups))]
+
+
+class AgentEngine:
+
+    """
+    Simulates every agent on its own with Agent.run() and Agent.update(), with the same interface as VectorizedEngine
+    """
+    def __init__(self, world, age, health, group, groups, group_behaviours, profiler=None):
+        self.world = world
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        self.groups = groups
+        self.group_behaviours = group_behaviours
+        self.agents = [Agent(i, float(age[i]), Health(int(health[i])), groups[group[i]])
+                       for i in range(world.num_nodes)]
+        self.group = np.asarray(group)
+        # updated on every transition of an agent, see PopulationCounters
+        self.counters = PopulationCounters(np.asarray(health), self.group, len(groups))
+        # the susceptible and infected agents, Agent.run() returns right away for recovered and vaccinated agents
+        self.active = [i for i in range(world.num_nodes) if self.agents[i].get_health_status() in self.active_health]
+
+    active_health = (Health.SUSCEPTIBLE, Health.INFECTED)
+
+    def step(self):
+        world = self.world
+        agents = self.agents
+        profiler = self.profiler
+        # group ids of the agents that changed from health old to health new, changed[(old, new)]
+        changed = {}
+        # Agent.run() records its phases (recover, look, look depth, act) itself
+        for i in self.active:
+            agent = agents[i]
+            old_health = agent.get_health_status()
+            agent.run(self.group_behaviours, world.neighbors(i).tolist(), world.depth_neighbors(i).tolist(), agents,
+                      profiler)
+            if agent.get_health_status() != old_health:
+                changed.setdefault((old_health, agent.get_health_status()), []).append(self.group[i])
+
+        # immune agents do not age any more, their age is never used again
+        t = profiler.tick()
+        active = []
+        for i in self.active:
+            agent = agents[i]
+            old_health = agent.get_health_status()
+            agent.update()
+            if agent.get_health_status() != old_health:
+                changed.setdefault((old_health, agent.get_health_status()), []).append(self.group[i])
+            if agent.get_health_status() in self.active_health:
+                active.append(i)
+        self.active = active
+        for (old_health, new_health), groups in changed.items():
+            self.counters.change(np.array(groups), old_health, new_health)
+        profiler.record("update", t)
+
+    @property
+    def health(self):
+        return np.array([agent.get_health_status().value for agent in self.agents], dtype=np.int8)
+
+    def absorbing(self):
+        """
+        :return: True if no agent can change its health any more, see VectorizedEngine.absorbing()
+        """
+        if self.counters.count(Health.INFECTED) > 0:
+            return False
+        # without infected agents all active agents are susceptible
+        Cv = {behaviour.type: behaviour.Cv for behaviour in self.group_behaviours}
+        for i in self.active:
+            if not Cv[self.agents[i]._group] > 0 or len(self.world.depth_neighbors(i)) == 0:
+                return False
+        return True
+
+
+def build_world(config, seed=None):
+    """
+    :param seed: seed or numpy.random.Generator of the network, config.network_seed or RandomStreams(config.seed).network
+    if None
+    :return: the SmallWorldNetwork of config, from the NetworkStore in config.network_cache if set
+    """
+    if seed is not None:
+        return SmallWorldNetwork(config.n, config.group_percentages, config.alpha, config.k,
+                                 config.change_edge_percentage, config.depth, seed=seed, mixing=config.mixing)
+
+    def build():
+        if config.network_seed is not None:
+            return build_world(config, np.random.default_rng(config.network_seed))
+        return build_world(config, RandomStreams(config.seed).network)
+
+    if config.network_cache is None:
+        return build()
+    return NetworkStore(config.network_cache).network(config, build)
+
+
+def setup(config, world=None, profiler=None):
+    """
+    Creates the network (unless an already built world is given) and the agents of config
+    :param profiler: PhaseProfiler passed to the engine
+    :return: world, engine
+    """
+    streams = RandomStreams(config.seed)
+    if world is None:
+        world = build_world(config)
+
+    ages, statuses, group_ids = create_population(world, config.groups, config.lim_init_infected,
+                                                  config.lim_init_vacci, config.age_mu, config.age_sigma,
+                                                  streams.population)
+    if config.engine == EngineMode.AGENT:
+        # the agents read their parameters from the Agent class
+        Agent.beta = config.beta
+        Agent.T = config.T
+        Agent.r = config.r
+        Agent.rng = streams.step
+        engine = AgentEngine(world, ages, statuses, group_ids, config.groups, config.group_behaviours(), profiler)
+    else:
+        engine = VectorizedEngine(world, ages, statuses, group_ids, config.groups, config.group_behaviours(),
+                                  incremental=config.engine == EngineMode.INCREMENTAL, rng=streams.step,
+                                  profiler=profiler, beta=config.beta, T=config.T, r=config.r)
+    return world, engine
+
+
+def run_simulation(config, world=None, on_frame=None, profiler=None, sink=None):
+    """
+    Runs the simulation of config for config.frames days
+    :param world: already built SmallWorldNetwork to reuse, a new one is built if None
+    :param on_frame: called as on_frame(frame, world, engine) after every day, e.g. to draw it
+    :param profiler: PhaseProfiler measuring the phases of every day, on_frame can record its phases in engine.profiler
+    :param sink: receives the progress after every day (PrintSink, JsonLinesSink), nothing is reported if None
+    :return: SimulationResults
+    """
+    if profiler is None:
+        profiler = NullProfiler()
+    if sink is None:
+        sink = NullSink()
+
+    world, engine = setup(config, world, profiler)
+    results = SimulationResults(config.frames, config.groups)
+    absorbing = False
+    for frame in range(config.frames):
+        profiler.start_day(frame)
+        if absorbing:
+            results.record(frame, results.counts[frame - 1])
+        else:
+            engine.step()
+            t = profiler.tick()
+            results.record(frame, engine.counters.counts)
+            absorbing = config.stop_early and engine.absorbing()
+            profiler.record("record", t)
+            if absorbing:
+                sink.metric("absorbing_frame", frame)
+                if on_frame is None:
+                    results.fill(frame)
+                    break
+        if on_frame is not None:
+            on_frame(frame, world, engine)
+        sink.progress("simulate", frame + 1, config.frames)
+    return results
+
+
+def setup_ensemble(config, replicates, world=None, profiler=None):
+    """
+    Creates the network (unless an already built world is given) and replicates populations on it for the EnsembleEngine,
+    every replicate with its own initial population
+    :return: world, engine
+    """
+    streams = RandomStreams(config.seed)
+    if world is None:
+        world = build_world(config)
+
+    health = np.zeros((replicates, world.num_nodes), dtype=np.int8)
+    for replicate, replicate_streams in enumerate(streams.spawn(replicates)):
+        ages, health[replicate], group_ids = create_population(world, config.groups, config.lim_init_infected,
+                                                               config.lim_init_vacci, config.age_mu, config.age_sigma,
+                                                               replicate_streams.population)
+    engine = EnsembleEngine(world, health, group_ids, config.groups, config.group_behaviours(), rng=streams.step,
+                            profiler=profiler, beta=config.beta, T=config.T, r=config.r)
+    return world, engine
+
+
+def run_ensemble(config, replicates, world=None, profiler=None, sink=None):
+    """
+    Runs replicates simulations of config on the same network together with the EnsembleEngine
+    :return: list of SimulationResults, one for every replicate, SimulationResults.mean() of it is the average
+    """
+    if profiler is None:
+        profiler = NullProfiler()
+    if sink is None:
+        sink = NullSink()
+
+    world, engine = setup_ensemble(config, replicates, world, profiler)
+    counts = np.zeros((replicates, config.frames, len(Health), len(config.groups)), dtype=np.int64)
+    for frame in range(config.frames):
+        profiler.start_day(frame)
+        engine.step()
+        t = profiler.tick()
+        counts[:, frame] = engine.counts
+        profiler.record("record", t)
+        sink.progress("simulate", frame + 1, config.frames)
+        if config.stop_early and engine.absorbing():
+            sink.metric("absorbing_frame", frame)
+            counts[:, frame + 1:] = counts[:, frame:frame + 1]
+            break
+    return [SimulationResults(config.frames, config.groups, counts[replicate]) for replicate in range(replicates)]
@@ -1,5 +1,8 @@
-import random
-import networkx as nx
+from itertools import chain
+
+import numpy as np
+
+from depth_neighbors import DepthNeighborsBuilder
 
 
 class SmallWorldNetwork:
@@ -7,54 +10,142 @@ class SmallWorldNetwork:
     """
     Creates a graph with num_nodes nodes and splits them up into num_groups = |group_percentage|
     watts_strogatz_graph(num_nodes_group, k, p, seed=None) graphs  and then then adds to every pair of distinct groups
-    i.e. groups i and j i != j, a * (|i| + |j|) edges.
-    Creates a list depth_neighbors of lists of integers. depth_neighbors[i] = list of all nodes j, i =/= j, with shortest path(i, j) <= depth
+    i.e. groups i and j i != j, a * (|i| + |j|) edges, or mixing[i][j] * (|i| + |j|) edges if a mixing matrix is given
+    (like a stochastic block model with a Watts-Strogatz graph in every block).
+    The network is stored in CSR form: the neighbors of node i are indices[indptr[i]:indptr[i + 1]] and all nodes j,
+    i =/= j, with shortest path(i, j) <= depth are depth_indices[depth_indptr[i]:depth_indptr[i + 1]]. Both are int32 arrays.
+    All edges are generated as numpy arrays and written into the CSR arrays directly, networkx is only needed for the
+    networkx.Graph in network, which is built on first access (e.g. for the spring layout or an export).
     https://networkx.github.io/documentation/networkx-1.10/reference/generated/networkx.generators.random_graphs.watts_strogatz_graph.html
     """
-    def __init__(self, num_nodes, group_percentages, a, k, p, depth):
+    def __init__(self, num_nodes, group_percentages, a, k, p, depth, seed=None, mixing=None):
+        """
+        :param seed: seed or numpy.random.Generator used for all random choices, seed=None gives a different network every time
+        :param mixing: symmetric num_groups x num_groups matrix, mixing[i][j] replaces a for the groups i and j, the
+        diagonal is not used
+        """
         num_groups = len(group_percentages)
+        self.rng = np.random.default_rng(seed)
 
         """
-        groups contains all watts_strogatz_graph graphs relating to group 0, ..., (num_groups - 1)
+        the nodes of group i are groups_translation[i], ..., groups_translation[i + 1] - 1 and group_colors[k] is the
+        group of node k
         """
-        self.groups = []
-        self.groups_translation = []
-        self.group_colors = []
-        self.network = nx.Graph()
+        self.group_sizes = np.array([int(num_nodes * percentage) for percentage in group_percentages], dtype=np.int64)
+        self.groups_translation = np.zeros(num_groups + 1, dtype=np.int64)
+        np.cumsum(self.group_sizes, out=self.groups_translation[1:])
+        self.group_colors = np.repeat(np.arange(num_groups, dtype=np.int32), self.group_sizes)
+        self.num_nodes = int(self.groups_translation[-1])
+        self._network = None
 
-        self.create_groups(group_percentages, k, num_groups, num_nodes, p)
-        self.combine_groups(num_groups)
-        self.connect_groups(a, num_groups)
-        self.depth_neighbors = []
+        sources, targets = self.create_groups(k, p)
+        group_sources, group_targets = self.connect_groups(a, num_groups, mixing)
+        self.indptr, self.indices = self.edges_to_csr(self.num_nodes, np.concatenate((sources, group_sources)),
+                                                      np.concatenate((targets, group_targets)))
+        self.depth_indptr = None
+        self.depth_indices = None
+        self.depth_neighbors_peak_bytes = 0
         self.compute_depth_neighbors(depth)
 
+    @classmethod
+    def from_arrays(cls, indptr, indices, depth_indptr, depth_indices, group_colors, groups_translation):
+        """
+        :return: SmallWorldNetwork with the given arrays (e.g. memory maps of a NetworkStore) instead of a generated one
+        """
+        world = cls.__new__(cls)
+        world.rng = None
+        world.indptr = indptr
+        world.indices = indices
+        world.depth_indptr = depth_indptr
+        world.depth_indices = depth_indices
+        world.depth_neighbors_peak_bytes = 0
+        world.group_colors = group_colors
+        world.groups_translation = groups_translation
+        world.group_sizes = np.diff(groups_translation)
+        world.num_nodes = len(indptr) - 1
+        world._network = None
+        return world
+
     def compute_depth_neighbors(self, depth):
-        self.depth_neighbors = []
-        for i in self.network:
+        """
+        Builds depth_indptr and depth_indices in chunks with the DepthNeighborsBuilder, see depth_neighbors.py
+        """
+        builder = DepthNeighborsBuilder(self.indptr, self.indices)
+        self.depth_indptr, self.depth_indices = builder.build(depth)
+        self.depth_neighbors_peak_bytes = builder.peak_bytes
+
+    def compute_depth_neighbors_networkx(self, depth):
+        """
+        Same as compute_depth_neighbors() but with a shortest path search from every node, slow for large networks
+        """
+        import networkx as nx
+
+        depth_neighbors = []
+        for i in range(self.num_nodes):
             """
             https://networkx.github.io/documentation/networkx-1.10/reference/generated/networkx.algorithms.shortest_paths.unweighted.single_source_shortest_path_length.html
             """
             dict = nx.single_source_shortest_path_length(self.network, i, cutoff=depth)
             dict.pop(i, None)
-            self.depth_neighbors.append(list(dict.keys()))
+            depth_neighbors.append(dict.keys())
+        self.depth_indptr, self.depth_indices = self.to_csr(depth_neighbors)
 
-    def connect_groups(self, a, num_groups):
+    @staticmethod
+    def edges_to_csr(num_nodes, sources, targets):
         """
-        Add edges between all groups i, j and  i != j, where the number of edges is a * |group i| * |group j|
+        Converts the undirected edges (sources[e], targets[e]) into the int32 arrays indptr and indices, st. the sorted
+        neighbors of node i are indices[indptr[i]:indptr[i + 1]]. Duplicate edges and self loops are dropped.
         """
-        for i in range(0, num_groups):
-            for j in range(i+1, num_groups):
-                size_i = len(self.groups[i])
-                size_j = len(self.groups[j])
-                num_add_edges = int(a * (size_i + size_j))
-                print("add", num_add_edges)
-                for k in range(0, num_add_edges):
-                    node_i = random.randint(0, size_i - 1) + self.groups_translation[i]
-                    node_j = random.randint(0, size_j - 1) + self.groups_translation[j]
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        keep = sources != targets
+        sources, targets = sources[keep], targets[keep]
 
-                    self.network.add_edge(node_i, node_j)
+        # every edge in both directions, sorted by (source, target) and unique
+        keys = np.concatenate((sources * num_nodes + targets, targets * num_nodes + sources))
+        keys.sort()
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        indptr = np.zeros(num_nodes + 1, dtype=np.int32)
+        np.cumsum(np.bincount(keys // num_nodes, minlength=num_nodes), out=indptr[1:])
+        indices = (keys % num_nodes).astype(np.int32)
+        return indptr, indices
 
-    def combine_groups(self, num_groups):
+    @staticmethod
+    def to_csr(neighbor_lists):
+        """
+        Converts a list of neighbor lists (one for every node 0, ..., n - 1) into the int32 arrays indptr and indices, st.
+        the sorted neighbors of node i are indices[indptr[i]:indptr[i + 1]]
+        """
+        neighbor_lists = [sorted(neighbors) for neighbors in neighbor_lists]
+        indptr = np.zeros(len(neighbor_lists) + 1, dtype=np.int32)
+        np.cumsum([len(neighbors) for neighbors in neighbor_lists], out=indptr[1:])
+        indices = np.fromiter(chain.from_iterable(neighbor_lists), dtype=np.int32, count=indptr[-1])
+        return indptr, indices
+
+    def neighbors(self, i):
+        """
+        :return: int32 array of the direct neighbors of node i
+        """
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def depth_neighbors(self, i):
+        """
+        :return: int32 array of all nodes j, i =/= j, with shortest path(i, j) <= depth
+        """
+        return self.depth_indices[self.depth_indptr[i]:self.depth_indptr[i + 1]]
+
+    @property
+    def network(self):
+        """
+        networkx.Graph of the network, only built on first access. Every node has a 'viz' color of its group for
+        exporting.
+        """
+        if self._network is None:
+            self._network = self.to_networkx()
+        return self._network
+
+    def to_networkx(self):
+        import networkx as nx
 
         #colors for exporting
         colors = [
@@ -64,34 +155,102 @@ class SmallWorldNetwork:
             {'r': 122, 'g': 0, 'b': 122, 'a': 1.0},
         ]
 
+        network = nx.Graph()
+        network.add_nodes_from((node, {'viz': {'color': colors[group % len(colors)]}})
+                               for node, group in enumerate(self.group_colors.tolist()))
+        sources = np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))
+        lower = sources < self.indices
+        network.add_edges_from(zip(sources[lower].tolist(), self.indices[lower].tolist()))
+        return network
+
+    def connect_groups(self, a, num_groups, mixing=None):
+        """
+        Draws the edges between all groups i, j and  i != j, where the number of edges is a * (|group i| + |group j|)
+        (mixing[i][j] instead of a if given). All endpoints of all pairs are drawn at once, so the cost only depends on
+        the number of edges and not on the number of pairs of groups. Edges drawn twice are only kept once.
+        :return: sources, targets of the edges
         """
-        Add all the nodes and edges of every group to a single graph. groups_stranslation will contain the translations
-        that are needed to convert from nodes of group i to the whole network. Also set the group_colors st.
-        group_colors[k] colors node k, st. all nodes in the same group have the same color.
-        """
-        k = 0
-        self.groups_translation.append(0)
-
-        for i in range(0, num_groups):
-            group = self.groups[i]
-            new_group = nx.Graph()
-            print(i, "edges", len(group.edges))
-            for node in group.nodes:
-                self.network.add_node(node + k)
-                new_group.add_node(node + k)
-                self.group_colors.append(i)
-                self.network.nodes[node+k]['viz'] = {'color': colors[i]}
-            for edge in group.edges:
-                self.network.add_edge(edge[0] + k, edge[1] + k)
-                new_group.add_edge(edge[0] + k, edge[1] + k)
-            k = k + len(group.nodes)
-            self.groups[i] = new_group
-            self.groups_translation.append(k)
-
-    def create_groups(self, group_percentages, k, num_groups, num_nodes, p):
-        """
-         creates for every group a watts_strogatz_graph graph and stores it in groups.
-        """
-        for i in range(0, num_groups):
-            num_nodes_group = int(num_nodes * group_percentages[i])
-            self.groups.append(nx.watts_strogatz_graph(num_nodes_group, k, p, seed=None))
+        group_i, group_j = np.triu_indices(num_groups, 1)
+        if mixing is None:
+            weights = np.full(len(group_i), a, dtype=float)
+        else:
+            weights = np.asarray(mixing, dtype=float)[group_i, group_j]
+        sizes_i = self.group_sizes[group_i]
+        sizes_j = self.group_sizes[group_j]
+        num_add_edges = (weights * (sizes_i + sizes_j)).astype(np.int64)
+
+        # pair of every edge
+        pairs = np.repeat(np.arange(len(group_i)), num_add_edges)
+        sources = self.rng.integers(0, sizes_i[pairs]) + self.groups_translation[group_i[pairs]]
+        targets = self.rng.integers(0, sizes_j[pairs]) + self.groups_translation[group_j[pairs]]
+
+        # sources are in a lower group than targets, so (source, target) identifies an edge
+        keys = sources * self.num_nodes + targets
+        if len(keys) == 0:
+            # a single group, a = 0 or no mixing
+            return sources, targets
+        order = np.argsort(keys, kind='stable')
+        first = order[np.concatenate(([True], keys[order[1:]] != keys[order[:-1]]))]
+        first.sort()
+        return sources[first], targets[first]
+
+    def create_groups(self, k, p):
+        """
+        creates for every group a watts_strogatz_graph graph, see watts_strogatz()
+        :return: sources, targets of the edges of all groups, as nodes of the whole network
+        """
+        sources = []
+        targets = []
+        for i in range(len(self.group_sizes)):
+            group_sources, group_targets = self.watts_strogatz(int(self.group_sizes[i]), k, p)
+            sources.append(group_sources + self.groups_translation[i])
+            targets.append(group_targets + self.groups_translation[i])
+        return np.concatenate(sources), np.concatenate(targets)
+
+    def watts_strogatz(self, num_nodes, k, p, max_rounds=16):
+        """
+        Same model as networkx.watts_strogatz_graph(num_nodes, k, p), for all edges at once: a ring where every node is
+        joined with its k // 2 neighbors on either side, then the far end of every edge is rewired with probability p to
+        a uniformly random node. Rewired edges that became a self loop or a duplicate are drawn again (max_rounds times,
+        then dropped), so there are num_nodes * (k // 2) edges as in networkx up to very rare exceptions.
+        :return: sources, targets of the edges (int64, every edge once)
+        """
+        if k >= num_nodes:
+            sources, targets = np.triu_indices(num_nodes, 1)
+            return sources.astype(np.int64), targets.astype(np.int64)
+
+        half = k // 2
+        sources = np.repeat(np.arange(num_nodes, dtype=np.int64), half)
+        targets = (sources + np.tile(np.arange(1, half + 1), num_nodes)) % num_nodes
+        if p <= 0 or len(sources) == 0:
+            return sources, targets
+
+        rewired = np.flatnonzero(self.rng.random(len(sources)) < p)
+        redraw = rewired
+        for i in range(max_rounds):
+            targets[redraw] = self.rng.integers(0, num_nodes, len(redraw))
+            invalid = self.invalid_edges(num_nodes, sources, targets, rewired)
+            redraw = invalid
+            if len(invalid) == 0:
+                break
+
+        keep = np.ones(len(sources), dtype=bool)
+        keep[redraw] = False
+        return sources[keep], targets[keep]
+
+    @staticmethod
+    def invalid_edges(num_nodes, sources, targets, rewired):
+        """
+        :return: the indices of the rewired edges that are self loops or a duplicate of another edge (of every set of
+        duplicates one edge is kept, the original one if there is one)
+        """
+        is_rewired = np.zeros(len(sources), dtype=bool)
+        is_rewired[rewired] = True
+        keys = np.minimum(sources, targets) * num_nodes + np.maximum(sources, targets)
+
+        # sorted by key, the not rewired edge first, all but the first edge of every key are duplicates
+        order = np.lexsort((is_rewired, keys))
+        duplicate = np.zeros(len(sources), dtype=bool)
+        duplicate[order[1:]] = keys[order[1:]] == keys[order[:-1]]
+
+        return np.flatnonzero(is_rewired & (duplicate | (sources == targets)))
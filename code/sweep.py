@@ -0,0 +1,81 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+
+import numpy as np
+
+from agent import Health
+from metrics import NullSink
+from random_streams import RandomStreams
+from results import SimulationResults
+from simulation import run_simulation, run_ensemble
+
+
+class SweepJob:
+
+    """
+    One simulation of a sweep: its SimulationConfig (with its own seed) and the index of its percentage, or replicates
+    simulations run together with the EnsembleEngine. Only holds plain values, so it can be sent to a worker process.
+    """
+    def __init__(self, config, vacci_iteration, replicates=None):
+        self.config = config
+        self.vacci_iteration = vacci_iteration
+        self.replicates = replicates
+
+
+def run_job(job):
+    """
+    Runs the simulation of job.
+    :return: vacci_iteration of the job, counts of SimulationResults (the sum over all replicates for an ensemble)
+    """
+    if job.replicates is not None:
+        return job.vacci_iteration, sum(results.counts for results in run_ensemble(job.config, job.replicates))
+    return job.vacci_iteration, run_simulation(job.config).counts
+
+
+def run_sweep(config, percentages, simulations_per_percentage, processes=None, sink=None, ensemble=False,
+              shared_network=False):
+    """
+    Runs simulations_per_percentage simulations for every truster percentage in percentages on a process pool, every
+    simulation with its own seed spawned from config.seed.
+    :param config: SimulationConfig of the simulations, group_percentages and seed are replaced for every simulation
+    (and network_seed if shared_network)
+    :param processes: number of worker processes, None => one for every core
+    :param sink: receives the progress after every simulation, nothing is reported if None
+    :param ensemble: run all simulations of a percentage together on one network with the EnsembleEngine (one job for
+    every percentage) instead of every simulation on its own network
+    :param shared_network: run all simulations of a percentage on the same network (with their own population and
+    days), so the network is only built once and the workers share it through the NetworkStore, but the average is no
+    longer over different networks
+    :return: list of SimulationResults, the average over all simulations of every percentage
+    """
+    if sink is None:
+        sink = NullSink()
+    if config.seed is None:
+        # the seeds of this sweep come from the OS, so its networks can never be used again
+        config = replace(config, network_cache=None)
+
+    root = RandomStreams(config.seed).seed_sequence
+    seeds = root.spawn(len(percentages) * simulations_per_percentage)
+    network_seeds = root.spawn(len(percentages))
+    jobs = []
+    for vacci_iteration in range(len(percentages)):
+        group_percentages = [percentages[vacci_iteration], round(1 - percentages[vacci_iteration], 1)]
+        percentage_config = replace(config, group_percentages=group_percentages)
+        if shared_network:
+            percentage_config = replace(percentage_config, network_seed=network_seeds[vacci_iteration])
+        if ensemble:
+            seed = seeds[vacci_iteration * simulations_per_percentage]
+            jobs.append(SweepJob(replace(percentage_config, seed=seed), vacci_iteration, simulations_per_percentage))
+            continue
+        for try_iteration in range(simulations_per_percentage):
+            seed = seeds[vacci_iteration * simulations_per_percentage + try_iteration]
+            jobs.append(SweepJob(replace(percentage_config, seed=seed), vacci_iteration))
+
+    sums = np.zeros((len(percentages), config.frames, len(Health), len(config.groups)))
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for done, (vacci_iteration, counts) in enumerate(executor.map(run_job, jobs), 1):
+            sums[vacci_iteration] += counts
+            sink.progress("sweep", done, len(jobs))
+
+    return [SimulationResults(config.frames, config.groups, sums[i] / simulations_per_percentage)
+            for i in range(len(percentages))]
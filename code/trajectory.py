@@ -0,0 +1,177 @@
+"""
+Binary trajectory of a simulation, all numbers little-endian:
+
+header      magic (8 bytes), num_nodes (int64), nnz (int64)
+topology    indptr (int32 * (num_nodes + 1)), indices (int32 * nnz), group (int32 * num_nodes)
+initial     health value of every node on day 0 (int8 * num_nodes), padded to a multiple of 4 bytes
+records     one for every simulated day: day (int32), count (int32), ids of the nodes that changed their health
+            (int32 * count), their new health value (int8 * count), padded to a multiple of 4 bytes
+
+The topology is stored once and every day only the changes, so the file is append-only and small. It is read with a
+numpy.memmap, so the arrays of a Trajectory are views into the file and nothing is copied.
+"""
+
+import numpy as np
+
+MAGIC = b"VNTRAJ01"
+HEADER = np.dtype([('magic', 'S8'), ('num_nodes', '<i8'), ('nnz', '<i8')])
+RECORD = np.dtype([('day', '<i4'), ('count', '<i4')])
+
+
+def padding(size):
+    return (-size) % 4
+
+
+class TrajectoryWriter:
+
+    """
+    Writes the topology of world and the initial health to path, then append() adds the changes of every day.
+    """
+    def __init__(self, path, world, health):
+        """
+        :param health: health value of every node on day 0
+        """
+        self.file = open(path, 'wb')
+        self.last = np.array(health, dtype=np.int8)
+
+        header = np.zeros(1, dtype=HEADER)
+        header['magic'] = MAGIC
+        header['num_nodes'] = world.num_nodes
+        header['nnz'] = len(world.indices)
+        self.file.write(header.tobytes())
+        self.file.write(np.asarray(world.indptr, dtype='<i4').tobytes())
+        self.file.write(np.asarray(world.indices, dtype='<i4').tobytes())
+        self.file.write(np.asarray(world.group_colors, dtype='<i4').tobytes())
+        self.file.write(self.last.tobytes() + bytes(padding(len(self.last))))
+
+    def append(self, day, health):
+        """
+        Stores the nodes whose health changed since the last call
+        """
+        health = np.asarray(health, dtype=np.int8)
+        changed = np.flatnonzero(health != self.last).astype('<i4')
+        record = np.zeros(1, dtype=RECORD)
+        record['day'] = day
+        record['count'] = len(changed)
+        self.file.write(record.tobytes())
+        self.file.write(changed.tobytes())
+        self.file.write(health[changed].tobytes() + bytes(padding(len(changed))))
+        self.last[changed] = health[changed]
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Trajectory:
+
+    """
+    Reads a file written by TrajectoryWriter. indptr, indices, group and initial_health are memory-mapped views into the
+    file, days[i] is the day of the i-th record.
+    """
+    def __init__(self, path):
+        self.data = np.memmap(path, dtype=np.uint8, mode='r')
+
+        header = self.data[:HEADER.itemsize].view(HEADER)[0]
+        if header['magic'] != MAGIC:
+            raise ValueError(path + " is not a trajectory")
+        self.num_nodes = int(header['num_nodes'])
+        nnz = int(header['nnz'])
+
+        offset = HEADER.itemsize
+        self.indptr, offset = self.array('<i4', offset, self.num_nodes + 1)
+        self.indices, offset = self.array('<i4', offset, nnz)
+        self.group, offset = self.array('<i4', offset, self.num_nodes)
+        self.initial_health, offset = self.array('i1', offset, self.num_nodes)
+        offset += padding(self.num_nodes)
+
+        # find all records
+        self.days = []
+        self.offsets = []
+        while offset < len(self.data):
+            record = self.data[offset:offset + RECORD.itemsize].view(RECORD)[0]
+            self.days.append(int(record['day']))
+            self.offsets.append(offset)
+            count = int(record['count'])
+            offset += RECORD.itemsize + 5 * count + padding(count)
+
+    def array(self, dtype, offset, count):
+        """
+        :return: view of count numbers of type dtype starting at offset, offset after them
+        """
+        size = np.dtype(dtype).itemsize * count
+        return self.data[offset:offset + size].view(dtype), offset + size
+
+    def changes(self, i):
+        """
+        :return: ids of the nodes whose health changed in the i-th record and their new health
+        """
+        offset = self.offsets[i]
+        count = int(self.data[offset:offset + RECORD.itemsize].view(RECORD)[0]['count'])
+        ids, offset = self.array('<i4', offset + RECORD.itemsize, count)
+        health, offset = self.array('i1', offset, count)
+        return ids, health
+
+    def states(self):
+        """
+        Generator of (day, health of every node) for day 0 and all recorded days
+        """
+        health = np.array(self.initial_health)
+        yield 0, health.copy()
+        for i in range(len(self.days)):
+            ids, new_health = self.changes(i)
+            health[ids] = new_health
+            yield self.days[i], health.copy()
+
+
+def to_dynamic_gexf(trajectory_path, gexf_path):
+    """
+    Converts a trajectory into a dynamic GEXF file for Gephi: every node has the static attribute group and the dynamic
+    attribute health (0 susceptible, 1 infected, 2 recovered, 3 vaccinated) with one spell [first day, last day] for
+    every period of the same health.
+    """
+    trajectory = Trajectory(trajectory_path)
+    end = trajectory.days[-1] if len(trajectory.days) > 0 else 0
+
+    # spells[i] = list of (health, start) of node i
+    spells = [[(int(health), 0)] for health in trajectory.initial_health]
+    for i in range(len(trajectory.days)):
+        ids, new_health = trajectory.changes(i)
+        for node, health in zip(ids.tolist(), new_health.tolist()):
+            spells[node].append((health, trajectory.days[i]))
+
+    with open(gexf_path, 'w') as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        file.write('<gexf xmlns="http://www.gexf.net/1.2draft" version="1.2">\n')
+        file.write('<graph mode="dynamic" defaultedgetype="undirected" timeformat="double" start="0" end="%d">\n' % end)
+        file.write('<attributes class="node" mode="static"><attribute id="group" title="group" type="integer"/>'
+                   '</attributes>\n')
+        file.write('<attributes class="node" mode="dynamic"><attribute id="health" title="health" type="integer"/>'
+                   '</attributes>\n')
+
+        file.write('<nodes>\n')
+        for node in range(trajectory.num_nodes):
+            file.write('<node id="%d" label="%d"><attvalues><attvalue for="group" value="%d"/>'
+                       % (node, node, trajectory.group[node]))
+            node_spells = spells[node]
+            for j in range(len(node_spells)):
+                health, start = node_spells[j]
+                last = node_spells[j + 1][1] - 1 if j + 1 < len(node_spells) else end
+                file.write('<attvalue for="health" value="%d" start="%d" end="%d"/>' % (health, start, last))
+            file.write('</attvalues></node>\n')
+        file.write('</nodes>\n')
+
+        file.write('<edges>\n')
+        edge = 0
+        for node in range(trajectory.num_nodes):
+            for neighbor in trajectory.indices[trajectory.indptr[node]:trajectory.indptr[node + 1]].tolist():
+                if node < neighbor:
+                    file.write('<edge id="%d" source="%d" target="%d"/>\n' % (edge, node, neighbor))
+                    edge += 1
+        file.write('</edges>\n')
+        file.write('</graph>\n</gexf>\n')
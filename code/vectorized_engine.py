@@ -0,0 +1,214 @@
+import numpy as np
+
+from agent import Agent, Health
+from decision_table import DecisionTable, cost_not_vaccinating, NOT_VACCINATE, VACCINATE
+from population_counters import PopulationCounters
+from infection_pressure import InfectionPressure, IncrementalInfectionPressure
+from metrics import NullProfiler
+from decision_calendar import DecisionCalendar
+
+
+class VectorizedEngine:
+
+    """
+    Array backed alternative to calling Agent.run() and Agent.update() for every node. The state of all agents is kept
+    in numpy arrays (health, group, gamma, lambda, age) and every step of the SIVR model is done for all agents at once.
+    The indices of the infected and of the susceptible agents are kept in compact arrays, so the cost of a day shrinks
+    as more and more agents are immune. The vaccination decisions are scheduled by a DecisionCalendar, so only the
+    agents deciding on a day look at their depth-k neighborhood.
+    The static parameters (beta, T, r) belong to the engine, so engines with different parameters can run side by side.
+
+    Semantics differ from the agent loop in one point only: every agent looks at the health states from the start of the
+    day, while in the agent loop an agent that recovered or got vaccinated earlier in the loop is already seen with its new
+    state by the agents looked at after it. Infections are two-phased in both (the _health_next update).
+
+    With incremental = True the number of infected neighbors of every agent is maintained between the days and only
+    updated for the agents that got infected or recovered, see IncrementalInfectionPressure.
+    """
+    def __init__(self, world, age, health, group, groups, group_behaviours, incremental=False, rng=None,
+                 profiler=None, beta=None, T=None, r=None):
+        """
+        :param world: SmallWorldNetwork the agents live on
+        :param age: age of every agent (years)
+        :param health: health value of every agent
+        :param group: group id of every agent, index into groups
+        :param groups: groups[i] is the Group of the agents with group id i
+        :param group_behaviours: the believes of every Group
+        :param incremental: update the infected neighbor counts on every transition instead of recounting them every day
+        :param rng: seed or numpy.random.Generator, all uniforms of a day are drawn from it in one block
+        :param profiler: PhaseProfiler that measures the phases of step(), nothing is measured if None
+        :param beta: infection rate, Agent.beta if None
+        :param T: how far agents look into the future when deciding to vaccinate (days), Agent.T if None
+        :param r: discount rate, Agent.r if None
+        """
+        self.world = world
+        self.beta = beta if beta is not None else Agent.beta
+        self.T = T if T is not None else Agent.T
+        self.r = r if r is not None else Agent.r
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        self.rng = np.random.default_rng(rng)
+        self.num_agents = len(health)
+        self.groups = groups
+
+        self.initial_age = np.asarray(age, dtype=float)
+        self.day = 0
+        self.health = np.array(health, dtype=np.int8)
+        self.infected_nodes = np.flatnonzero(self.health == Health.INFECTED.value)
+        self.susceptible_nodes = np.flatnonzero(self.health == Health.SUSCEPTIBLE.value)
+        self.infected_next = np.zeros(self.num_agents, dtype=bool)
+        self.group = np.asarray(group, dtype=np.int8)
+        self.lambda_k = np.zeros(self.num_agents)
+        self.lambda_rel_k = np.zeros(self.num_agents)
+        self.num_infected = np.zeros(self.num_agents, dtype=np.int64)
+        self.num_neighbors = np.zeros(self.num_agents, dtype=np.int64)
+        # estimate_gamma() does not depend on the age, so it is only estimated once
+        self.gamma_k = self.estimate_gamma()
+
+        # Ci and Cv of every group id
+        self.Ci = np.zeros(len(groups))
+        self.Cv = np.zeros(len(groups))
+        for i in range(0, len(groups)):
+            for behaviour in group_behaviours:
+                if behaviour.type == groups[i]:
+                    self.Ci[i] = behaviour.Ci
+                    self.Cv[i] = behaviour.Cv
+
+        if incremental:
+            self.pressure = IncrementalInfectionPressure(world, self.infected_nodes)
+        else:
+            self.pressure = InfectionPressure(world, self.infected_nodes)
+
+        self.counters = PopulationCounters(self.health, self.group, len(groups))
+
+        self.calendar = DecisionCalendar(self.rng)
+        self.calendar.schedule(self.susceptible_nodes, self.day, 1 / self.T)
+
+        self.table = DecisionTable()
+        self.max_size = int(max(self.pressure.num_neighbors.max(initial=0),
+                                self.pressure.num_depth_neighbors.max(initial=0)))
+
+    def step(self):
+        """
+        Simulates one day for all agents, equivalent to Agent.run() followed by Agent.update() for every agent. Only the
+        active agents are looked at: the infected ones (recovery) and the susceptible ones (vaccination decision), of
+        which only those with infected neighbors can get infected. Recovered and vaccinated agents cost nothing.
+        """
+        profiler = self.profiler
+        t = profiler.tick()
+        infected = self.infected_nodes
+        susceptible = self.susceptible_nodes
+
+        count_infected = self.pressure.count(infected, susceptible)
+        self.table.update_infection(self.beta, self.max_size)
+        t = profiler.record("count", t)
+
+        # Get infected? (only possible with infected neighbors)
+        exposed = count_infected > 0
+        count_infected = count_infected[exposed]
+        exposed = susceptible[exposed]
+        self.look(exposed, count_infected, self.pressure.num_neighbors[exposed])
+        infected_next = exposed[self.rng.random(len(exposed)) < self.lambda_k[exposed]]
+        self.infected_next[infected_next] = True
+        t = profiler.record("look", t)
+
+        # Get vaccinated? (Decide once in T days, on the days drawn by the calendar)
+        due = self.calendar.due(self.day)
+        due = due[self.health[due] == Health.SUSCEPTIBLE.value]
+        deciding = due[~self.infected_next[due]]
+        self.look(deciding, self.pressure.count_depth(deciding), self.pressure.num_depth_neighbors[deciding])
+        t = profiler.record("look depth", t)
+        pvacc, p = self.rng.random((2, len(deciding)))
+        self.act(deciding, pvacc, p)
+        self.calendar.schedule(deciding[self.health[deciding] == Health.SUSCEPTIBLE.value], self.day + 1, 1 / self.T)
+        t = profiler.record("act", t)
+
+        # Recover?
+        recovered = infected[self.rng.random(len(infected)) < self.gamma_k[infected]]
+        self.health[recovered] = Health.RECOVERED.value
+        self.pressure.change(recovered, -1)
+        self.counters.change(self.group[recovered], Health.INFECTED, Health.RECOVERED)
+        t = profiler.record("recover", t)
+
+        self.update(infected_next)
+        self.infected_next[infected_next] = False
+        self.pressure.change(infected_next, 1)
+        self.counters.change(self.group[infected_next], Health.SUSCEPTIBLE, Health.INFECTED)
+
+        # keep the active agents
+        self.infected_nodes = np.concatenate((infected[self.health[infected] == Health.INFECTED.value], infected_next))
+        self.susceptible_nodes = susceptible[self.health[susceptible] == Health.SUSCEPTIBLE.value]
+        profiler.record("update", t)
+
+    def absorbing(self):
+        """
+        :return: True if no agent can change its health any more: nobody is infected, so nobody gets infected or
+        recovers, and the cost of not vaccinating is 0 without infected agents, so every susceptible agent (with a
+        neighborhood) of a group with Cv > 0 decides not to vaccinate
+        """
+        if len(self.infected_nodes) > 0:
+            return False
+        susceptible = self.susceptible_nodes
+        return bool(np.all(self.Cv[self.group[susceptible]] > 0)
+                    and np.all(self.pressure.num_depth_neighbors[susceptible] > 0))
+
+    def look(self, nodes, count_infected, total):
+        """
+        Updates lambda_k and lambda_rel_k of the agents with the indices nodes given the number of infected agents and
+        the number of agents in their neighborhood (count_infected[j] and total[j] belong to nodes[j])
+        """
+        self.lambda_k[nodes] = self.estimate_lambda(count_infected)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.lambda_rel_k[nodes] = self.beta * count_infected / total
+        self.num_infected[nodes] = count_infected
+        self.num_neighbors[nodes] = total
+
+    def act(self, deciding, pvacc, p):
+        """
+        Vaccination decision of the agents with the indices deciding, see Agent.act()
+        :param pvacc: uniforms used as pvacc if both costs are equal
+        :param p: uniforms compared with pvacc
+        """
+        group = self.group[deciding]
+        gamma_k = self.gamma_k[deciding]
+
+        # Get pvacc, random if both costs are equal
+        if len(deciding) > 0 and np.all(gamma_k == gamma_k[0]):
+            self.table.update_decisions(self.beta, self.T, self.r, gamma_k[0], self.Ci, self.Cv, self.max_size)
+            decision = self.table.decision(group, self.num_infected[deciding], self.num_neighbors[deciding])
+            pvacc[decision == NOT_VACCINATE] = 0.0
+            pvacc[decision == VACCINATE] = 1.0
+        else:
+            # the table is built for one gamma only
+            Cnotv_k = cost_not_vaccinating(self.lambda_rel_k[deciding], gamma_k, self.Ci[group], self.r, self.T)
+            pvacc[self.Cv[group] > Cnotv_k] = 0.0
+            pvacc[self.Cv[group] < Cnotv_k] = 1.0
+
+        # Update health state based on pvacc
+        vaccinated = deciding[pvacc >= p]
+        self.health[vaccinated] = Health.VACCINATED.value
+        self.counters.change(self.group[vaccinated], Health.SUSCEPTIBLE, Health.VACCINATED)
+
+    @property
+    def age(self):
+        return self.initial_age + self.day / 365
+
+    def update(self, infected_next):
+        # Assume simulation time-step equal to 1 day
+        self.day += 1
+
+        # next state health state
+        self.health[infected_next] = Health.INFECTED.value
+
+    def estimate_lambda(self, num_infected):
+        """
+        see Agent.estimate_lambda()
+        """
+        return self.table.infection_probability[num_infected]
+
+    def estimate_gamma(self):
+        """
+        see Agent.estimate_gamma()
+        """
+        maxGamma = 0.05
+        maxGamma += 0.00000019121986216
+        return np.full(self.num_agents, maxGamma)